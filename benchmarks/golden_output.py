@@ -0,0 +1,190 @@
+"""
+Golden-output regression harness
+
+runs an experiment of the grid with short runs and records a trace of every completed order, i.e. the arrival,
+release, start and finish at each work centre, commitment of each material and completion, together with the experiment
+database. The golden output of the current build is stored in benchmarks/golden, a candidate build is checked against it
+with tolerance controls.
+
+usage
+    python benchmarks/golden_output.py record --experiments 0 1 2 3    store the golden output
+    python benchmarks/golden_output.py check --experiments 0 1 2 3     compare the current build with the golden output
+    python benchmarks/golden_output.py check --rtol 1e-6 --atol 1e-9  accept small numerical differences
+"""
+import argparse
+import io
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), 'full_model'))
+
+GOLDEN_DIR = os.path.join(BENCHMARK_DIR, 'golden')
+
+# short runs, stored with the golden output and reused by the check. All settings changing the sample path are pinned
+# to the random streams and collection of the original model, the golden output does not follow the defaults
+MODEL_SETTINGS = {'WARM_UP_PERIOD': 200,
+                  'RUN_TIME': 800,
+                  'NUMBER_OF_RUNS': 2,
+                  'REPLICATION_MODE': 'sequential',
+                  'WARM_START': False,
+                  'STOPPING_RULE': 'fixed',
+                  'RANDOM_VARIATES': 'single',
+                  'QUEUE_MODE': 'heap',
+                  'PROCESS_TIME_DISTRIBUTION': '2_erlang',
+                  'PLANNED_LEAD_TIME': 'analytical',
+                  'data_collection': 'main',
+                  'RESULT_WRITER': 'memory',
+                  'PERIODIC_COLLECTION': 'sampled',
+                  'PERIODIC_TRACE': False,
+                  'PROFILING': False}
+
+TRACE_COLUMNS = ['identifier', 'event', 'object', 'time']
+# number of differences printed for each experiment
+MAX_PRINTED_DIFFERENCES = 10
+
+
+class OrderTrace(object):
+    def __init__(self, simulation):
+        """
+        records the trace of each completed order, by wrapping the final data collection of the process
+        :param simulation: simulation object
+        """
+        self.sim = simulation
+        self.rows = []
+        data_collection_final = self.sim.process.data_collection_final
+
+        def wrapper(order):
+            self.record(order=order)
+            return data_collection_final(order=order)
+        self.sim.process.data_collection_final = wrapper
+        return
+
+    def record(self, order):
+        rows = self.rows
+        identifier = order.identifier
+        rows.append((identifier, 'arrival', '', order.arrival_time))
+        rows.append((identifier, 'release', '', order.release_time))
+        for work_centre in order.routing_sequence_data:
+            rows.append((identifier, 'start', str(work_centre), order.order_start_time[work_centre]))
+            rows.append((identifier, 'finish', str(work_centre), order.proc_finished_time[work_centre]))
+        for material in order.materials:
+            rows.append((identifier, 'commitment', material.type, material.material_commitment_time))
+        rows.append((identifier, 'completion', '', order.completion_time))
+        return
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.rows, columns=TRACE_COLUMNS)
+
+
+def run_experiment(exp_number, model_settings):
+    """
+    :return: order trace and experiment database of the experiment
+    """
+    from simulationmodel import SimulationModel
+    sim = SimulationModel(exp_number=exp_number, print_info=False, model_settings=model_settings)
+    trace = OrderTrace(simulation=sim)
+    sim.sim_function()
+    return trace.to_dataframe(), sim.data.experiment_database
+
+
+def golden_files(exp_number):
+    name = os.path.join(GOLDEN_DIR, f'exp_{exp_number}')
+    return name + '_trace.csv.gz', name + '_database.csv', name + '_settings.json'
+
+
+def record(exp_number):
+    trace, database = run_experiment(exp_number=exp_number, model_settings=MODEL_SETTINGS)
+    trace_file, database_file, settings_file = golden_files(exp_number=exp_number)
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    trace.to_csv(trace_file, index=False)
+    database.to_csv(database_file, index=False)
+    with open(settings_file, 'w') as file:
+        json.dump(MODEL_SETTINGS, file, indent=1, sort_keys=True)
+    print(f"experiment {exp_number}: golden output recorded, {trace['identifier'].nunique()} orders")
+    return
+
+
+def compare_frames(candidate, golden, keys, rtol, atol):
+    """
+    compare two DataFrames column by column, the numerical columns with tolerance
+    :param keys: columns identifying a row in the messages
+    :return: list with the differences
+    """
+    if list(candidate.columns) != list(golden.columns):
+        return [f"columns differ: {list(candidate.columns)} != {list(golden.columns)}"]
+    if candidate.shape[0] != golden.shape[0]:
+        return [f"number of rows differ: {candidate.shape[0]} != {golden.shape[0]}"]
+    different = np.zeros(candidate.shape[0], dtype=bool)
+    for column in candidate.columns:
+        if pd.api.types.is_numeric_dtype(golden[column]) and pd.api.types.is_numeric_dtype(candidate[column]):
+            different |= ~np.isclose(candidate[column].to_numpy(dtype=float), golden[column].to_numpy(dtype=float),
+                                     rtol=rtol, atol=atol, equal_nan=True)
+        else:
+            different |= candidate[column].astype(str).to_numpy() != golden[column].astype(str).to_numpy()
+    differences = []
+    for row in np.flatnonzero(different):
+        key = ', '.join(f'{k}={golden[k].iloc[row]}' for k in keys)
+        values = [f'{column}: {candidate[column].iloc[row]} != {golden[column].iloc[row]}'
+                  for column in candidate.columns if str(candidate[column].iloc[row]) != str(golden[column].iloc[row])]
+        differences.append(f"{key}: {'; '.join(values)}")
+    return differences
+
+
+def check(exp_number, rtol, atol):
+    """
+    run the current build and compare it with the golden output of the experiment
+    :return: True if the output equals the golden output within the tolerance
+    """
+    trace_file, database_file, settings_file = golden_files(exp_number=exp_number)
+    if not os.path.exists(settings_file):
+        raise Exception(f"no golden output for experiment {exp_number}, record it first")
+    with open(settings_file) as file:
+        model_settings = json.load(file)
+    trace, database = run_experiment(exp_number=exp_number, model_settings=model_settings)
+    golden_trace = pd.read_csv(trace_file, keep_default_na=False, float_precision='round_trip')
+    golden_database = pd.read_csv(database_file, float_precision='round_trip')
+
+    # the trace is compared in the order of the orders and their events, independent of the completion order
+    sort = ['identifier', 'event', 'object']
+    trace = trace.astype({'object': str}).sort_values(sort, kind='stable').reset_index(drop=True)
+    golden_trace = golden_trace.astype({'object': str}).sort_values(sort, kind='stable').reset_index(drop=True)
+    differences = compare_frames(candidate=trace, golden=golden_trace, keys=sort, rtol=rtol, atol=atol)
+    # the database is read back from csv, compare the values as written
+    database = pd.read_csv(io.StringIO(database.to_csv(index=False)), float_precision='round_trip')
+    differences += compare_frames(candidate=database, golden=golden_database, keys=['run'], rtol=rtol, atol=atol)
+
+    if len(differences) == 0:
+        print(f"experiment {exp_number}: equal to the golden output")
+        return True
+    print(f"experiment {exp_number}: {len(differences)} differences with the golden output")
+    for difference in differences[:MAX_PRINTED_DIFFERENCES]:
+        print(f"\t{difference}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('mode', choices=['record', 'check'])
+    parser.add_argument('--experiments', type=int, nargs='*', default=[0, 1, 2, 3], help='experiment numbers')
+    parser.add_argument('--rtol', type=float, default=0, help='relative tolerance of the numerical values')
+    parser.add_argument('--atol', type=float, default=0, help='absolute tolerance of the numerical values')
+    arguments = parser.parse_args()
+
+    if arguments.mode == 'record':
+        for exp_number in arguments.experiments:
+            record(exp_number=exp_number)
+        return
+    equal = [check(exp_number=exp_number, rtol=arguments.rtol, atol=arguments.atol)
+             for exp_number in arguments.experiments]
+    if not all(equal):
+        sys.exit(1)
+    return
+
+
+if __name__ == '__main__':
+    main()
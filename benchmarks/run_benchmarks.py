@@ -0,0 +1,204 @@
+"""
+Benchmark suite of the simulation model
+
+short, fixed-seed runs of the release techniques, material allocation, material replenishment and material complexity
+combinations. Each case runs in a fresh process and reports the wall time, events per second, orders per second and
+peak memory. The results are compared with the stored baseline: the KPIs must be equal to the baseline and the wall time
+may not exceed the baseline by more than the tolerance.
+
+usage
+    python benchmarks/run_benchmarks.py                     run all cases and compare with the baseline
+    python benchmarks/run_benchmarks.py --cases DRACO_NHB   run the cases whose name contains one of the strings
+    python benchmarks/run_benchmarks.py --update-baseline   store the results as the new baseline
+"""
+import argparse
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), 'full_model'))
+
+# peak memory is only available on unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# short runs, the model settings are the same for every case. The baseline is recorded with the buffered variates
+MODEL_SETTINGS = {'WARM_UP_PERIOD': 500,
+                  'RUN_TIME': 1500,
+                  'NUMBER_OF_RUNS': 2,
+                  'REPLICATION_MODE': 'sequential',
+                  'STOPPING_RULE': 'fixed',
+                  'RANDOM_VARIATES': 'buffered',
+                  'data_collection': 'main',
+                  'RESULT_WRITER': 'memory',
+                  'PROFILING': False}
+
+# grid points of the benchmark
+RELEASE_TECHNIQUES = {'DRACO': 25, 'CONWIP': 50, 'BIL': None}
+MATERIAL_ALLOCATION = ['NHB', 'HB']
+MATERIAL_REPLENISHMENT = ['ExHed', 'PoHed']
+MATERIAL_COMPLEXITY = ['single', 'multiple', 'random']
+
+# relative difference accepted between the KPIs and the baseline, to allow for floating point summation order
+KPI_TOLERANCE = 1e-9
+
+
+def benchmark_cases():
+    """
+    :return: dictionary with the name and parameter dictionary of each case
+    """
+    import exp_paramaters as parameters
+    template = parameters.get_experiment_grid()[0]
+    cases = {}
+    for (release_technique, release_target), allocation, replenishment, complexity in itertools.product(
+            RELEASE_TECHNIQUES.items(), MATERIAL_ALLOCATION, MATERIAL_REPLENISHMENT, MATERIAL_COMPLEXITY):
+        params_dict = copy.deepcopy(template)
+        params_dict['name'] = 'benchmark'
+        params_dict['release_technique'] = release_technique
+        params_dict['release_target'] = release_target
+        params_dict['material_allocation'] = allocation
+        params_dict['material_replenishment'] = replenishment
+        params_dict['material_complexity'] = complexity
+        params_dict['material_complexity_dict'] = copy.deepcopy(parameters.material_complexity_dict[complexity])
+        cases[f'{release_technique}_{allocation}_{replenishment}_{complexity}'] = params_dict
+    return cases
+
+
+def run_case(params_dict):
+    """
+    run a single case, executed in a fresh worker process
+    :param params_dict: parameter dictionary of the case
+    :return: dictionary with the performance and KPIs of the case
+    """
+    import exp_paramaters as parameters
+    from simulationmodel import SimulationModel
+    exp_number = parameters.get_experiment_grid().add(params_dict)
+    sim = SimulationModel(exp_number=exp_number, print_info=False, model_settings=MODEL_SETTINGS)
+    # count the events
+    events = 0
+    step = sim.env.step
+
+    def counting_step():
+        nonlocal events
+        events += 1
+        return step()
+    sim.env.step = counting_step
+
+    start = time.perf_counter()
+    sim.sim_function()
+    wall_time = time.perf_counter() - start
+
+    database = sim.data.experiment_database
+    peak_memory = None if resource is None else round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 1)
+    kpis = {column: float(value) for column, value in database.mean(numeric_only=True).items()}
+    return {'wall_time': wall_time,
+            'events': events,
+            'events_per_s': events / wall_time,
+            'orders': sim.data.order_output_counter,
+            'orders_per_s': sim.data.order_output_counter / wall_time,
+            'peak_rss_mb': peak_memory,
+            'kpis': kpis}
+
+
+def run_benchmarks(cases, repeat):
+    """
+    run the cases, each repetition in a new process. The fastest repetition is reported
+    :return: dictionary with the results of each case
+    """
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name, params_dict in cases.items():
+        repetitions = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                repetitions.append(executor.submit(run_case, params_dict).result())
+        results[name] = min(repetitions, key=lambda result: result['wall_time'])
+        print(f"{name:<28} wall {results[name]['wall_time']:8.2f} s   "
+              f"events/s {results[name]['events_per_s']:10.0f}   "
+              f"orders/s {results[name]['orders_per_s']:8.0f}   "
+              f"peak {results[name]['peak_rss_mb']} MB")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    compare the results with the baseline
+    :param tolerance: accepted relative increase of the wall time
+    :return: list with the failures
+    """
+    failures = []
+    print(f"\n{'case':<28} {'wall/baseline':>14}  KPIs")
+    for name, result in results.items():
+        if name not in baseline['cases']:
+            print(f"{name:<28} {'no baseline':>14}")
+            continue
+        reference = baseline['cases'][name]
+        ratio = result['wall_time'] / reference['wall_time']
+        different = [kpi for kpi, value in reference['kpis'].items()
+                     if kpi not in result['kpis'] or
+                     abs(result['kpis'][kpi] - value) > KPI_TOLERANCE * max(abs(value), 1)]
+        print(f"{name:<28} {ratio:>14.2f}  {'equal' if len(different) == 0 else 'DIFFERENT: ' + ', '.join(different)}")
+        if len(different) > 0:
+            failures.append(f"{name}: KPIs differ from the baseline ({', '.join(different)})")
+        if ratio > 1 + tolerance:
+            failures.append(f"{name}: wall time {ratio:.2f} times the baseline")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cases', nargs='*', default=None, help='run the cases whose name contains one of the strings')
+    parser.add_argument('--repeat', type=int, default=1, help='repetitions of each case, the fastest is reported')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='accepted relative increase of the wall time')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    arguments = parser.parse_args()
+
+    cases = benchmark_cases()
+    if arguments.cases is not None:
+        cases = {name: params_dict for name, params_dict in cases.items()
+                 if any(selection in name for selection in arguments.cases)}
+        if len(cases) == 0:
+            raise Exception(f"no benchmark case matches {arguments.cases}")
+    results = run_benchmarks(cases=cases, repeat=arguments.repeat)
+
+    if arguments.update_baseline:
+        baseline = {'machine': platform.node(),
+                    'python': platform.python_version(),
+                    'model_settings': MODEL_SETTINGS,
+                    'cases': {}}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE) as file:
+                baseline['cases'] = json.load(file)['cases']
+        baseline['cases'].update(results)
+        with open(BASELINE_FILE, 'w') as file:
+            json.dump(baseline, file, indent=1, sort_keys=True)
+        print(f"\nbaseline saved in {BASELINE_FILE}")
+        return
+
+    if not os.path.exists(BASELINE_FILE):
+        raise Exception("no baseline found, create it with --update-baseline")
+    with open(BASELINE_FILE) as file:
+        baseline = json.load(file)
+    if baseline['machine'] != platform.node():
+        print(f"\nthe baseline is measured on {baseline['machine']}, wall times are not comparable")
+    failures = compare(results=results, baseline=baseline, tolerance=arguments.tolerance)
+    if len(failures) > 0:
+        print("\nbenchmark failed:\n\t" + "\n\t".join(failures))
+        sys.exit(1)
+    print("\nbenchmark passed")
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+from bisect import bisect_left, insort
 from simpy import FilterStore, PriorityResource
 
 
@@ -31,22 +32,234 @@ class Queue(FilterStore):
         self.name = f'Queue {self.identifier}'
         return
 
+    def __len__(self):
+        return len(self.items)
+
     def __str__(self):
         return self.name
 
 
-class Pool(FilterStore):
+class IndexedHeap(object):
+    def __init__(self) -> None:
+        """
+        binary min-heap where each entry is addressable by an identifier.
+        entries are [key, identifier], position keeps the heap index of each identifier
+        """
+        self.heap = []
+        self.position = {}
+        return
+
+    def push(self, identifier, key):
+        self.position[identifier] = len(self.heap)
+        self.heap.append([key, identifier])
+        self._sift_up(index=len(self.heap) - 1)
+        return
+
+    def peek(self):
+        return self.heap[0][1]
+
+    def pop(self):
+        identifier = self.heap[0][1]
+        self.remove(identifier=identifier)
+        return identifier
+
+    def remove(self, identifier):
+        """
+        remove an arbitrary entry in O(log n)
+        :param identifier: identifier of the entry
+        :return: void
+        """
+        index = self.position.pop(identifier)
+        last = self.heap.pop()
+        if index < len(self.heap):
+            # move the last entry into the hole and restore the heap
+            self.heap[index] = last
+            self.position[last[1]] = index
+            self._sift_up(index=index)
+            self._sift_down(index=self.position[last[1]])
+        return
+
+    def _sift_up(self, index):
+        heap = self.heap
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if entry[0] < heap[parent][0]:
+                heap[index] = heap[parent]
+                self.position[heap[index][1]] = index
+                index = parent
+            else:
+                break
+        heap[index] = entry
+        self.position[entry[1]] = index
+        return
+
+    def _sift_down(self, index):
+        heap = self.heap
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if heap[child][0] < entry[0]:
+                heap[index] = heap[child]
+                self.position[heap[index][1]] = index
+                index = child
+            else:
+                break
+        heap[index] = entry
+        self.position[entry[1]] = index
+        return
+
+    def __contains__(self, identifier):
+        return identifier in self.position
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class HeapQueue(object):
     def __init__(self,
                  sim,
                  env,
                  id
                  ) -> None:
-        super().__init__(env=env)
+        """
+        queue backed by an indexed binary heap on the dispatching priority of the queue items.
+        ties are broken by the order of entry, as in the sorted FilterStore queue.
+        the priority of a queue item is fixed when it enters the queue
+        """
         self.sim = sim
+        self.env = env
+        self.identifier = id
+        self.name = f'Queue {self.identifier}'
+        self.index_order_object = 1
+        self.index_priority = 2
+        self.heap = IndexedHeap()
+        self.queue_items = {}
+        self.entry_counter = 0
+        return
+
+    @property
+    def items(self):
+        # queue items in order of entry
+        return list(self.queue_items.values())
+
+    def put(self, queue_item):
+        identifier = queue_item[self.index_order_object].identifier
+        self.queue_items[identifier] = queue_item
+        self.heap.push(identifier=identifier, key=(queue_item[self.index_priority], self.entry_counter))
+        self.entry_counter += 1
+        return
+
+    def most_urgent(self):
+        return self.queue_items[self.heap.peek()]
+
+    def remove(self, identifier):
+        self.heap.remove(identifier=identifier)
+        return self.queue_items.pop(identifier)
+
+    def __len__(self):
+        return len(self.queue_items)
+
+    def __str__(self):
+        return self.name
+
+
+class Pool(object):
+    def __init__(self,
+                 sim,
+                 env,
+                 id
+                 ) -> None:
+        """
+        pool of orders waiting for release, kept sorted on pool priority.
+        secondary indexes give the orders per gateway work centre and per required material
+        """
+        self.sim = sim
+        self.env = env
         self.identifier = id
         self.name = f'Pool {self.identifier}'
+        self.index_order_object = 1
+        self.index_priority = 2
+        self.pool_items = {}
+        self.pool_keys = {}
+        self.sequence = []
+        self.gateway_sequence = {}
+        self.material_index = {}
+        self.entry_counter = 0
+        return
+
+    @property
+    def items(self):
+        # pool items sorted on pool priority, ties in order of entry
+        return [self.pool_items[key[-1]] for key in self.sequence]
+
+    def put(self, pool_item):
+        order = pool_item[self.index_order_object]
+        key = (pool_item[self.index_priority], self.entry_counter, order.identifier)
+        self.entry_counter += 1
+        self.pool_items[order.identifier] = pool_item
+        self.pool_keys[order.identifier] = key
+        insort(self.sequence, key)
+        # gateway index
+        gateway = order.next_work_centre
+        if gateway not in self.gateway_sequence:
+            self.gateway_sequence[gateway] = []
+        insort(self.gateway_sequence[gateway], key)
+        # material index
+        for material in set(order.requirements):
+            if material not in self.material_index:
+                self.material_index[material] = set()
+            self.material_index[material].add(order.identifier)
         return
 
+    def remove(self, identifier):
+        pool_item = self.pool_items.pop(identifier)
+        order = pool_item[self.index_order_object]
+        key = self.pool_keys.pop(identifier)
+        del self.sequence[bisect_left(self.sequence, key)]
+        gateway_sequence = self.gateway_sequence[order.next_work_centre]
+        del gateway_sequence[bisect_left(gateway_sequence, key)]
+        for material in set(order.requirements):
+            self.material_index[material].discard(identifier)
+        return pool_item
+
+    def gateway_items(self, work_centre):
+        """
+        pool items with the work centre as first operation, sorted on pool priority
+        """
+        if work_centre not in self.gateway_sequence:
+            return []
+        return [self.pool_items[key[-1]] for key in self.gateway_sequence[work_centre]]
+
+    def subset_items(self, identifiers, work_centre=None):
+        """
+        pool items of a subset of orders, sorted on pool priority
+        :param identifiers: identifiers of the orders in the pool
+        :param work_centre: if given, only the orders with this gateway work centre
+        """
+        keys = sorted([self.pool_keys[identifier] for identifier in identifiers])
+        items = [self.pool_items[key[-1]] for key in keys]
+        if work_centre is not None:
+            items = [pool_item for pool_item in items
+                     if pool_item[self.index_order_object].next_work_centre == work_centre]
+        return items
+
+    def material_orders(self, material):
+        """
+        identifiers of the orders in the pool that require the material
+        """
+        if material not in self.material_index:
+            return set()
+        return self.material_index[material]
+
+    def __len__(self):
+        return len(self.pool_items)
+
     def __str__(self):
         return self.name
 
@@ -1,17 +1,22 @@
 from typing import Dict, List, ClassVar
 from generalfunctions import GeneralFunctions
-from capacity_sources import Machine, Queue, Pool, Inventory
+from capacity_sources import Machine, Queue, HeapQueue, Pool, Inventory
 import exp_paramaters as parameters
+from leadtimequantiles import CACHE_FILE
 
 
 class ModelPanel(object):
-    def __init__(self, experiment_number: int, simulation: ClassVar) -> None:
+    def __init__(self, experiment_number: int, simulation: ClassVar, model_settings: Dict = None) -> None:
+        """
+        :param model_settings: settings replacing the defaults below, applied before the model panel builds on them
+        """
         self.experiment_number: int = experiment_number
         self.sim: ClassVar = simulation
-        self.print_info: bool = True
-        self.print_results: bool = True
-        experimental_params_dict = parameters.get_interactions()
-        self.params_dict: Dict[...] = experimental_params_dict[self.experiment_number]
+        self.model_settings: Dict = model_settings if model_settings is not None else {}
+        self.applied_settings: set = set()
+        self.print_info: bool = self.setting('print_info', True)
+        self.print_results: bool = self.setting('print_results', True)
+        self.params_dict: Dict[...] = parameters.get_experiment_grid()[self.experiment_number]
         self.general_functions: GeneralFunctions = GeneralFunctions(simulation=self.sim)
 
         # project names
@@ -40,42 +45,98 @@ class ModelPanel(object):
             self.experiment_name += str(self.params_dict[i]) + "_"
 
         # simulation parameters
-        self.WARM_UP_PERIOD: int = 5000  # warm-up period simulation model
-        self.RUN_TIME: int = 10000  # run time simulation model
-        self.NUMBER_OF_RUNS: int = 150  # 5 # number of replications
+        self.WARM_UP_PERIOD: int = self.setting('WARM_UP_PERIOD', 5000)  # warm-up period simulation model
+        self.RUN_TIME: int = self.setting('RUN_TIME', 10000)  # run time simulation model
+        self.NUMBER_OF_RUNS: int = self.setting('NUMBER_OF_RUNS', 150)  # 5 # number of replications
+        """
+        replication modes
+            - sequential: all replications in one environment, each run after a warm-up period 
+            - independent: blocks of replications as separate models with their own seed, run in a process pool
+        with WARM_START, the independent blocks share a single warm-up. The warmed-up model is forked for each block
+        and continues with the random streams of the block, instead of starting from an empty shop (requires os.fork).
+        the blocks start from the same state, the sample path of the single warm-up, so they are correlated and not
+        independent replications, so WARM_START does not support the sequential stopping rule
+        """
+        self.REPLICATION_MODE = self.setting('REPLICATION_MODE', 'sequential')  # 'independent' #
+        self.REPLICATION_WORKERS = self.setting('REPLICATION_WORKERS', None)  # None uses all processors
+        self.RUNS_PER_BLOCK = self.setting('RUNS_PER_BLOCK', 1)
+        self.WARM_START = self.setting('WARM_START', False)
+        if self.WARM_START and self.REPLICATION_MODE != 'independent':
+            raise Exception("warm-started replications require the independent replication mode")
+        """
+        stopping rules
+            - fixed: run all NUMBER_OF_RUNS replications
+            - sequential: stop once the relative half-width of the confidence interval of all STOPPING_CRITERIA is 
+            below STOPPING_PRECISION, with at least MIN_RUNS and at most NUMBER_OF_RUNS replications. Requires the main
+            data collection
+        """
+        self.STOPPING_RULE = self.setting('STOPPING_RULE', 'fixed')  # 'sequential' #
+        self.STOPPING_CRITERIA = self.setting('STOPPING_CRITERIA', ['mean_ttt'])  # ['mean_total_cost', 'mean_ttt'] #
+        self.STOPPING_PRECISION = self.setting('STOPPING_PRECISION', 0.05)  # relative half-width of the 95% confidence interval
+        self.MIN_RUNS = self.setting('MIN_RUNS', 10)
+        if self.WARM_START and self.STOPPING_RULE == 'sequential':
+            raise Exception("the sequential stopping rule requires independent runs, not warm-started replications")
+        """
+        random variates
+            - single: one draw per variate from the python and numpy generators
+            - buffered: numpy variates per stream, drawn in blocks of VARIATE_BLOCK_SIZE (other sample path)
+        """
+        self.RANDOM_VARIATES = self.setting('RANDOM_VARIATES', 'single')  # 'buffered' #
+        self.VARIATE_BLOCK_SIZE = self.setting('VARIATE_BLOCK_SIZE', 4096)
+        # time and count the calls of the subsystems, the report is saved as profile_<experiment name>.csv
+        self.PROFILING = self.setting('PROFILING', False)
+        if self.PROFILING and self.REPLICATION_MODE == 'independent':
+            raise Exception("profiling does not support independent replications")
 
         # manufacturing process and order characteristics
         self.SHOP_ATTRIBUTES = {"work_centres": self.params_dict["stations"],
                                 'routing_configuration': "GFS"
                                 }
         # manufacturing system
-        self.MANUFACTURING_FLOOR_LAYOUT: List[str, ...] = []
+        """
+        queue modes
+            - heap: indexed binary heap on the dispatching priority
+            - filter_store: sorted FilterStore, kept for validation
+        """
+        self.QUEUE_MODE = self.setting('QUEUE_MODE', 'heap')  # 'filter_store' #
+        # work centres are identified by their integer position in the layout, the names are used for output only
+        self.MANUFACTURING_FLOOR_LAYOUT: List[int, ...] = []
+        self.WORK_CENTRE_NAMES: List[str, ...] = []
         # make pool
         self.POOLS: Pool = Pool(sim=self.sim,
                                 env=self.sim.env,
                                 id=f"pool"
                                 )
         # make work centers
-        self.WORK_CENTRES: Dict[...] = {}
-        self.QUEUES: Dict[...] = {}
+        self.WORK_CENTRES: List[Machine, ...] = []
+        self.QUEUES: List[...] = []
         for i in range(0, self.SHOP_ATTRIBUTES["work_centres"]):
             # construct layout
-            self.MANUFACTURING_FLOOR_LAYOUT.append(f'WC{i}')
+            self.MANUFACTURING_FLOOR_LAYOUT.append(i)
+            self.WORK_CENTRE_NAMES.append(f'WC{i}')
             # add machines
-            self.WORK_CENTRES[f'WC{i}']: Machine = Machine(sim=self.sim,
-                                                           env=self.sim.env,
-                                                           capacity_slots=1,
-                                                           id=f"WC{i}"
-                                                           )
+            self.WORK_CENTRES.append(Machine(sim=self.sim,
+                                             env=self.sim.env,
+                                             capacity_slots=1,
+                                             id=f"WC{i}"
+                                             ))
             # add queues
-            self.QUEUES[f'WC{i}']: Queue = Queue(sim=self.sim,
-                                                 env=self.sim.env,
-                                                 id=f"WC{i}"
-                                                 )
+            if self.QUEUE_MODE == 'heap':
+                self.QUEUES.append(HeapQueue(sim=self.sim,
+                                             env=self.sim.env,
+                                             id=f"WC{i}"
+                                             ))
+            elif self.QUEUE_MODE == 'filter_store':
+                self.QUEUES.append(Queue(sim=self.sim,
+                                         env=self.sim.env,
+                                         id=f"WC{i}"
+                                         ))
+            else:
+                raise Exception(f"queue mode {self.QUEUE_MODE} is not known")
 
         # set inter arrival time
         self.AIMED_UTILIZATION: float = self.params_dict["utilization"]
-        self.MEAN_PROCESS_TIME: float = 1
+        self.MEAN_PROCESS_TIME: float = self.setting('MEAN_PROCESS_TIME', 1)
         self.MEAN_TIME_BETWEEN_ARRIVAL = self.general_functions.arrival_time_calculator(
             wc_and_flow_config=self.SHOP_ATTRIBUTES['routing_configuration'],
             manufacturing_floor_layout=self.MANUFACTURING_FLOOR_LAYOUT,
@@ -95,7 +156,7 @@ class ModelPanel(object):
             - exponential
             - uniform
         """
-        self.PROCESS_TIME_DISTRIBUTION = '2_erlang'
+        self.PROCESS_TIME_DISTRIBUTION = self.setting('PROCESS_TIME_DISTRIBUTION', '2_erlang')
 
         # orders
         """
@@ -143,12 +204,12 @@ class ModelPanel(object):
             - k_erlang
                 need to define k
         """
-        self.DELIVERY = "supplier" # "immediate" #
-        self.SUPPLY_DISTRIBUTION = 'constant' # 'normal'
+        self.DELIVERY = self.setting('DELIVERY', "supplier") # "immediate" #
+        self.SUPPLY_DISTRIBUTION = self.setting('SUPPLY_DISTRIBUTION', 'constant') # 'normal'
         self.supply_k = 2
         self.supply_sigma = 10
         # disruption
-        self.DISRUPTION = False
+        self.DISRUPTION = self.setting('DISRUPTION', False)
         self.disruption_severity = 1
         self.disruption_duration = 500
 
@@ -158,23 +219,63 @@ class ModelPanel(object):
         self.earliness_cost = self.params_dict["earliness_cost"]
         self.tardiness_cost = self.params_dict["tardiness_cost"]
 
+        '''
+        planned lead times, the quantile c_t / (c_t + c_e) of the manufacturing lead time
+            - analytical: M/G/1 approximation of the station throughput time with a normal quantile
+            - simulated: interpolated from the cache of simulated quantiles in LEAD_TIME_CACHE. The shipped cache holds
+            GFS shops with 6 stations, 2_erlang and exponential process times with mean 1 and utilization 0.50-0.97
+        '''
+        self.PLANNED_LEAD_TIME = self.setting('PLANNED_LEAD_TIME', 'analytical')  # 'simulated' #
+        self.LEAD_TIME_CACHE = self.setting('LEAD_TIME_CACHE', CACHE_FILE)
+
         '''
         data collection types
             - main 
             - order
             - periodic 
         '''
-        self.data_collection ='periodic' #  'order' # 'main' #
+        self.data_collection = self.setting('data_collection', 'periodic') #  'order' # 'main' #
+        if self.STOPPING_RULE == 'sequential' and self.data_collection != 'main':
+            raise Exception("the sequential stopping rule requires the main data collection")
         if self.data_collection != 'main':
             self.experiment_name = f'df_{self.data_collection}_' +self.experiment_name
+        '''
+        result writers for the order and periodic data collection
+            - memory: keep the database in memory and save it as csv at the end of the experiment
+            - parquet: stream the data of each run as a row group to a parquet file, requires pyarrow
+        '''
+        self.RESULT_WRITER = self.setting('RESULT_WRITER', 'memory')  # 'parquet' #
+        '''
+        periodic data collection of the on-hand inventory and WIP
+            - sampled: sample the state every PERIODIC_INTERVAL with a polling process
+            - time_weighted: exact time-weighted averages for each run, updated only when the state changes
+        with PERIODIC_TRACE, time_weighted stores the state down-sampled to PERIODIC_INTERVAL instead of the averages
+        '''
+        self.PERIODIC_COLLECTION = self.setting('PERIODIC_COLLECTION', 'sampled')  # 'time_weighted' #
+        self.PERIODIC_TRACE = self.setting('PERIODIC_TRACE', False)
+        self.PERIODIC_INTERVAL = self.setting('PERIODIC_INTERVAL', 0.5)
+        if self.RESULT_WRITER == 'parquet' and self.REPLICATION_MODE == 'independent':
+            raise Exception("the parquet result writer does not support independent replications")
+        for name in self.model_settings:
+            if name not in self.applied_settings:
+                raise Exception(f"{name} is not a setting of the model panel")
         return
 
+    def setting(self, name: str, default):
+        """
+        :return: the value of the model settings if given, else the default
+        """
+        if name in self.model_settings:
+            self.applied_settings.add(name)
+            return self.model_settings[name]
+        return default
+
 
 class PolicyPanel(object):
     def __init__(self, experiment_number: int, simulation) -> None:
         self.sim = simulation
         self.experiment_number: int = experiment_number
-        self.params_dict: Dict[...] = parameters.experimental_params_dict[self.experiment_number]
+        self.params_dict: Dict[...] = parameters.get_experiment_grid()[self.experiment_number]
         # due date determination
         """
         due date procedure
@@ -1,4 +1,121 @@
+import numpy as np
 import pandas as pd
+from resultwriter import ParquetResultWriter, result_file
+
+
+class OrderResultBuffer(object):
+    def __init__(self, columns, capacity=1024):
+        """
+        columnar buffer with the results of the completed orders, a typed array per column that grows geometrically
+        and is reused across runs
+        :param columns: list with (column name, numpy type)
+        :param capacity: initial number of rows
+        """
+        self.data = np.empty(capacity, dtype=columns)
+        self.size = 0
+        return
+
+    def append(self, row):
+        """
+        write the result of an order in the next row
+        :param row: tuple with a value for each column
+        :return: void
+        """
+        if self.size == self.data.shape[0]:
+            data = np.empty(2 * self.data.shape[0], dtype=self.data.dtype)
+            data[:self.size] = self.data
+            self.data = data
+        self.data[self.size] = row
+        self.size += 1
+        return
+
+    def column(self, name):
+        return self.data[name][:self.size]
+
+    def reset(self):
+        self.size = 0
+        return
+
+    def __len__(self):
+        return self.size
+
+
+class TimeWeightedState(object):
+    def __init__(self, simulation, interval, trace):
+        """
+        time-weighted on-hand inventory and WIP, the integrals are updated when the state changes
+        :param simulation: simulation object
+        :param interval: interval of the down-sampled trace
+        :param trace: keep the down-sampled trace
+        """
+        self.sim = simulation
+        self.interval = interval
+        self.trace = trace
+        self.active = False
+        # state and integrals of the current run
+        self.on_hand = 0
+        self.wip = 0
+        self.run_start = 0
+        self.last_time = 0
+        self.on_hand_integral = 0
+        self.wip_integral = 0
+        # down-sampled trace
+        self.next_sample = 0
+        self.trace_data = list()
+        return
+
+    def get_state(self):
+        on_hand = self.sim.inventory.total_on_hand
+        if self.sim.policy_panel.release_technique == "DRACO":
+            wip = self.sim.system_state_dispatching.get_wip()
+        else:
+            wip = self.sim.release.get_wip()
+        return on_hand, wip
+
+    def advance(self, now):
+        """
+        integrate the state up to now, the samples before now hold the state since the last change
+        """
+        if self.trace:
+            while self.next_sample < now:
+                self.trace_data.append([self.on_hand, self.wip])
+                self.next_sample += self.interval
+        self.on_hand_integral += self.on_hand * (now - self.last_time)
+        self.wip_integral += self.wip * (now - self.last_time)
+        self.last_time = now
+        return
+
+    def update(self):
+        """
+        called when the on-hand inventory or the WIP changes
+        """
+        if not self.active:
+            return
+        self.advance(now=self.sim.env.now)
+        self.on_hand, self.wip = self.get_state()
+        return
+
+    def start_run(self):
+        now = self.sim.env.now
+        self.active = True
+        self.run_start = now
+        self.last_time = now
+        self.next_sample = now
+        self.on_hand_integral = 0
+        self.wip_integral = 0
+        self.trace_data = list()
+        self.on_hand, self.wip = self.get_state()
+        return
+
+    def end_run(self):
+        """
+        :return: time-weighted average on-hand inventory and WIP of the run, and the trace
+        """
+        now = self.sim.env.now
+        self.advance(now=now)
+        self.active = False
+        duration = now - self.run_start
+        return self.on_hand_integral / duration, self.wip_integral / duration, self.trace_data
 
 
 class DataCollection(object):
@@ -10,39 +127,100 @@ class DataCollection(object):
         self.order_input_counter = 0
         self.accumulated_process_time = 0
 
-        self.experiment_database = None
-        self.order_list = list()
+        # the database is stored in chunks, concatenated when the database is requested and cached until the next chunk
+        self.database_chunks = list()
+        self.database_cache = None
         self.periodic_data = list()
 
-        # columns names
-        self.columns_names_run = [
-            'identifier',
-            'product_name',
-            'throughput_time',
-            'pool_time',
-            'shop_throughput_time',
-            'lateness',
-            'tardiness',
-            'earliness',
-            'tardy',
-            'material_waiting_time',
-            'material_replenishment_time',
-            'inventory_time',
-            'material_present',
-            'routing_length',
-            'number_of_materials',
-            'schedule_accuracy'
+        # stream the order and periodic data to file, if required
+        self.result_writer = None
+        if self.sim.model_panel.RESULT_WRITER == 'parquet' and \
+                self.sim.model_panel.data_collection in ['order', 'periodic']:
+            self.result_writer = ParquetResultWriter(file=result_file(path=self.sim.get_directory(),
+                                                                      experiment_name=self.sim.model_panel.experiment_name))
+
+        # event-driven periodic data collection, if required
+        self.state_recorder = None
+        if self.sim.model_panel.data_collection == 'periodic' and \
+                self.sim.model_panel.PERIODIC_COLLECTION == 'time_weighted':
+            self.state_recorder = TimeWeightedState(simulation=self.sim,
+                                                    interval=self.sim.model_panel.PERIODIC_INTERVAL,
+                                                    trace=self.sim.model_panel.PERIODIC_TRACE)
+
+        # columns of the order results
+        self.columns_run = [
+            ('identifier', np.int64),
+            ('throughput_time', np.float64),
+            ('pool_time', np.float64),
+            ('shop_throughput_time', np.float64),
+            ('lateness', np.float64),
+            ('tardiness', np.float64),
+            ('earliness', np.float64),
+            ('tardy', np.int64),
+            ('material_waiting_time', np.float64),
+            ('material_replenishment_time', np.float64),
+            ('inventory_time', np.float64),
+            ('material_present', np.int64),
+            ('routing_length', np.int64),
+            ('number_of_materials', np.int64),
+            ('schedule_accuracy', np.int64)
         ]
+        self.columns_names_run = [name for name, _ in self.columns_run]
+        self.order_results = OrderResultBuffer(columns=self.columns_run)
         return
 
+    @property
+    def experiment_database(self):
+        """
+        database of the experiment, the stored chunks are concatenated into a single DataFrame on request. The
+        DataFrame is cached until a new chunk is stored
+        :return: DataFrame or None if nothing is stored
+        """
+        if self.database_cache is None and len(self.database_chunks) > 0:
+            if len(self.database_chunks) > 1:
+                self.database_cache = pd.concat(self.database_chunks, ignore_index=True)
+            else:
+                self.database_cache = self.database_chunks[0]
+            # the chunks are replaced by the cached DataFrame, the data is not stored twice
+            self.database_chunks = [self.database_cache]
+        return self.database_cache
+
+    @experiment_database.setter
+    def experiment_database(self, database):
+        self.database_chunks = list() if database is None else [database]
+        self.database_cache = database
+
+    def store_chunk(self, database):
+        """
+        store the database of a run, in memory or streamed to file
+        :param database: DataFrame of the run
+        :return: void
+        """
+        if self.result_writer is not None:
+            self.result_writer.write(database=database)
+        else:
+            self.database_chunks.append(database)
+            self.database_cache = None
+        return
+
+    def database_memory(self):
+        """
+        memory used by the experiment database
+        :return: memory in bytes
+        """
+        database = self.experiment_database
+        if database is None:
+            return 0
+        return int(database.memory_usage(deep=True).sum())
+
     def append_run_list(self, result_list):
         """
-        append the result of an order to the already existing order list
-        :param result_list:
+        append the result of an order to the order result buffer
+        :param result_list: tuple with a value for each column of the order results
         :return: void
         """
         if self.sim.model_panel.data_collection in ['main', 'order']:
-            self.order_list.append(result_list)
+            self.order_results.append(row=result_list)
         return
 
     def run_update(self, warmup):
@@ -58,84 +236,111 @@ class DataCollection(object):
             elif self.sim.model_panel.data_collection == 'order':
                 self.store_order_data()
             elif self.sim.model_panel.data_collection == 'periodic':
-                pass
+                if self.state_recorder is not None:
+                    self.store_time_weighted_data()
             else:
                 raise Exception('no valid data collection mode')
 
         # data processing finished. Update database new run
-        self.order_list = list()
+        self.order_results.reset()
         self.accumulated_process_time = 0
         return
 
     def store_run_data(self):
-        # put all data into dataframe
-        df_run = pd.DataFrame(self.order_list)
-        df_run.columns = self.columns_names_run
+        # order results of the run
+        results = self.order_results
+        number_of_orders = len(results)
+        throughput_time = results.column("throughput_time")
+        shop_throughput_time = results.column("shop_throughput_time")
+        lateness = results.column("lateness")
+        tardiness = results.column("tardiness")
+        earliness = results.column("earliness")
+        inventory_time = results.column("inventory_time")
 
-        # dataframe for each run
-        df = pd.DataFrame(
-            [(int(self.sim.env.now / (self.sim.model_panel.WARM_UP_PERIOD + self.sim.model_panel.RUN_TIME)))],
-            columns=['run'])
+        # results for each run
+        run = dict()
+        run['run'] = int(self.sim.env.now / (self.sim.model_panel.WARM_UP_PERIOD + self.sim.model_panel.RUN_TIME))
 
         # generic measures
         number_of_machines_in_process = len(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT)
-        df[f"utilization"] = ((self.accumulated_process_time * 100 / number_of_machines_in_process)
+        run["utilization"] = ((self.accumulated_process_time * 100 / number_of_machines_in_process)
                               / self.sim.model_panel.RUN_TIME)
         # order information
-        df[f"mean_ttt"] = df_run.loc[:, "throughput_time"].mean()
-        df[f"mean_ptt"] = df_run.loc[:, "pool_time"].mean()
-        df[f"mean_sttt"] = df_run.loc[:, "shop_throughput_time"].mean()
+        run["mean_ttt"] = throughput_time.mean()
+        run["mean_ptt"] = results.column("pool_time").mean()
+        run["mean_sttt"] = shop_throughput_time.mean()
 
         # material information
-        # df[f"mean_mat_avail_t"] = df_run.loc[:, "material_waiting_time"].mean()
-        # df[f'mean_mat_reple_t'] = df_run.loc[:, "material_replenishment_time"].mean()
-        # df[f'std_mat_reple_t'] = df_run.loc[:, "material_replenishment_time"].std()
-        df[f'mean_mat_inv_t'] = df_run.loc[:, "inventory_time"].mean()
-        df[f'fill_rate'] = df_run.loc[:, "material_present"].mean()
+        # run["mean_mat_avail_t"] = results.column("material_waiting_time").mean()
+        # run['mean_mat_reple_t'] = results.column("material_replenishment_time").mean()
+        # run['std_mat_reple_t'] = results.column("material_replenishment_time").std(ddof=1)
+        run['mean_mat_inv_t'] = inventory_time.mean()
+        run['fill_rate'] = results.column("material_present").mean()
 
         # due date
-        df["mean_lateness"] = df_run.loc[:, "lateness"].mean()
-        df["std_lateness"] = df_run.loc[:, "lateness"].std()
-        df["mean_tardiness"] = df_run.loc[:, "tardiness"].mean()
-        df["mean_earliness"] = df_run.loc[:, "earliness"].mean()
-        df["mean_squared_tardiness"] = (df_run.loc[:, "tardiness"] ** 2).mean()
-        df["percentage_tardy"] = df_run.loc[:, "tardy"].sum() / df_run.shape[0]
-        # df["schedule_accuracy"] = df_run.loc[:, "schedule_accuracy"].sum() / df_run.shape[0]
+        run["mean_lateness"] = lateness.mean()
+        run["std_lateness"] = lateness.std(ddof=1)
+        run["mean_tardiness"] = tardiness.mean()
+        run["mean_earliness"] = earliness.mean()
+        run["mean_squared_tardiness"] = (tardiness ** 2).mean()
+        run["percentage_tardy"] = results.column("tardy").sum() / number_of_orders
+        # run["schedule_accuracy"] = results.column("schedule_accuracy").sum() / number_of_orders
 
         # cost
         arrival_rate = 1 / self.sim.model_panel.MEAN_TIME_BETWEEN_ARRIVAL
 
-        df["mean_holding_cost"] = df_run.loc[:, "inventory_time"].mean() * arrival_rate * self.sim.model_panel.holding_cost
-        df["mean_WIP_cost"] = df_run.loc[:, "shop_throughput_time"].mean() * arrival_rate * self.sim.model_panel.WIP_cost
-        df["mean_earliness_cost"] = df_run.loc[:, "earliness"].mean() * self.sim.model_panel.earliness_cost
-        df["mean_tardiness_cost"] = df_run.loc[:, "tardiness"].mean() * self.sim.model_panel.tardiness_cost
-        df["mean_total_cost"] = df[["mean_holding_cost", "mean_WIP_cost", "mean_earliness_cost", "mean_tardiness_cost"]].sum(axis=1)
+        run["mean_holding_cost"] = inventory_time.mean() * arrival_rate * self.sim.model_panel.holding_cost
+        run["mean_WIP_cost"] = shop_throughput_time.mean() * arrival_rate * self.sim.model_panel.WIP_cost
+        run["mean_earliness_cost"] = earliness.mean() * self.sim.model_panel.earliness_cost
+        run["mean_tardiness_cost"] = tardiness.mean() * self.sim.model_panel.tardiness_cost
+        run["mean_total_cost"] = run["mean_holding_cost"] + run["mean_WIP_cost"] + run["mean_earliness_cost"] + \
+                                 run["mean_tardiness_cost"]
 
-        df_exp_interactions = self.add_experiment_variables()
-        df = pd.concat([df, df_exp_interactions], axis=1)
+        # experiment variables, these may repeat the name of a run measure (utilization)
+        columns = list(run.keys())
+        values = list(run.values())
+        for i, index in enumerate(self.sim.model_panel.names_variables):
+            columns.append(f"{self.sim.model_panel.names_variables[i]}")
+            values.append(self.sim.model_panel.params_dict[index])
 
         # add key information
-        df['reorder_point'] = self.sim.policy_panel.reorder_level
-        df['planned_station_lead_time'] = self.sim.general_functions.station_planned_lead_time(
-            r_i=number_of_machines_in_process/2)
+        columns += ['reorder_point', 'planned_station_lead_time']
+        values += [self.sim.policy_panel.reorder_level,
+                   self.sim.general_functions.station_planned_lead_time(r_i=number_of_machines_in_process/2)]
 
         # save data from the run
-        if self.experiment_database is None:
-            self.experiment_database = df
-            # self.experiment_database = df_run # save the entire run database
+        df = pd.DataFrame([values], columns=columns)
+        self.database_chunks.append(df)
+        self.database_cache = None
+        return
+
+    def start_periodic_data_collection(self):
+        """
+        start the periodic data collection at the end of the warm-up period
+        :return: void
+        """
+        if self.sim.model_panel.PERIODIC_COLLECTION == 'time_weighted':
+            self.state_recorder.start_run()
+        elif self.sim.model_panel.PERIODIC_COLLECTION == 'sampled':
+            self.sim.env.process(self.periodic_data_collection())
         else:
-            self.experiment_database = pd.concat([self.experiment_database, df], ignore_index=True)
+            raise Exception('no valid periodic data collection')
         return
 
-    def add_experiment_variables(self):
-        df_exp_interaction = pd.DataFrame()
-        for i, index in enumerate(self.sim.model_panel.names_variables):
-            df_exp_interaction[f"{self.sim.model_panel.names_variables[i]}"] = [self.sim.model_panel.params_dict[index]]
-        return df_exp_interaction
+    def store_time_weighted_data(self):
+        run = int(self.sim.env.now / (self.sim.model_panel.WARM_UP_PERIOD + self.sim.model_panel.RUN_TIME))
+        on_hand, wip, trace = self.state_recorder.end_run()
+        if self.sim.model_panel.PERIODIC_TRACE:
+            df = pd.DataFrame(trace, columns=['on_hand', 'wip'])
+            df.insert(0, 'run', run)
+        else:
+            df = pd.DataFrame([[run, on_hand, wip]], columns=['run', 'on_hand', 'wip'])
+        self.store_chunk(database=df)
+        return
 
     def periodic_data_collection(self):
         # 25 runs
-        periodic_interval = 0.5
+        periodic_interval = self.sim.model_panel.PERIODIC_INTERVAL
         t_start = self.sim.env.now
         while True:
             # collect total free inventory
@@ -157,24 +362,15 @@ class DataCollection(object):
         # save data from the run
         df = pd.DataFrame(self.periodic_data)
         df.columns = ['on_hand', 'wip']
-        if self.experiment_database is None:
-            self.experiment_database = df
-        else:
-            self.experiment_database = pd.concat([self.experiment_database, df], ignore_index=True)
+        self.store_chunk(database=df)
         # clear list
         self.periodic_data = list()
         return
 
     def store_order_data(self):
-        # put all data into dataframe
-        df_run = pd.DataFrame(self.order_list)
-        df_run.columns = self.columns_names_run
         # order information
-        df = df_run.loc[:, ("pool_time", "shop_throughput_time")]
+        df = pd.DataFrame({"pool_time": self.order_results.column("pool_time").copy(),
+                           "shop_throughput_time": self.order_results.column("shop_throughput_time").copy()})
         # save data from the run
-        if self.experiment_database is None:
-            self.experiment_database = df
-            # self.experiment_database = df_run # save the entire run database
-        else:
-            self.experiment_database = pd.concat([self.experiment_database, df], ignore_index=True)
+        self.store_chunk(database=df)
         return
\ No newline at end of file
@@ -4,7 +4,8 @@ Made By: Arno Kasper
 Version: 1.0.0
 """
 
-from exp_manager import Experiment_Manager
+from exp_manager import Experiment_Manager, Parallel_Experiment_Manager
+import argparse
 import time
 
 # track run time
@@ -14,8 +15,16 @@ start_time = time.time()
 lower_limit = 1
 upper_limit = 1
 
+# number of worker processes, 1 runs the experiments one after the other
+parser = argparse.ArgumentParser()
+parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+arguments = parser.parse_args()
+
 # activate the simulation (automatic model)
-Experiment_Manager(lower_limit, upper_limit)
+if arguments.workers > 1:
+    Parallel_Experiment_Manager(lower_limit, upper_limit, workers=arguments.workers)
+else:
+    Experiment_Manager(lower_limit, upper_limit)
 
 # provide essential experimental information
 t_time = (time.time() - start_time)
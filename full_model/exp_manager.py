@@ -9,7 +9,10 @@ import random
 import warnings
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 import simulationmodel as sim
+import exp_paramaters as parameters
 
 
 class Experiment_Manager(object):
@@ -56,6 +59,12 @@ class Experiment_Manager(object):
         save all the experiment data versions
         :return: void
         """
+        # the data is already streamed to file
+        if self.sim.data.result_writer is not None:
+            self.sim.data.result_writer.close()
+            print(f"simulation data streamed to:    {self.sim.data.result_writer.file}")
+            return
+
         # initialize params
         df = self.sim.data.experiment_database
         file_version = ".csv"  # ".xlsx"#".csv"#
@@ -116,6 +125,7 @@ class Experiment_Manager(object):
         if self.sim.print_info:
             print(f"\tinput this experiment:      {self.sim.data.order_input_counter}")
             print(f"\toutput this experiment:     {self.sim.data.order_output_counter}")
+            print(f"\tdatabase memory:            {round(self.sim.data.database_memory() / 1e6, 3)} MB")
 
     def save_database_csv(self, file, database):
         database.to_csv(file, index=False)
@@ -145,3 +155,147 @@ class Experiment_Manager(object):
             path = os.path.abspath(os.getcwd())
             print(f"files are saved in {path}")
         return path
+
+
+# number of broken pools after which an experiment runs on a pool of its own
+ISOLATION_BREAKS = 2
+
+
+class Parallel_Experiment_Manager(object):
+    # Run a batch of experiments with a upper an lower limit on a pool of worker processes
+    def __init__(self, lower, upper, workers, retries=2):
+        """
+        initialize experiments integers
+        :param lower: lower boundary of the exp number
+        :param upper: upper boundary of the exp number
+        :param workers: number of worker processes
+        :param retries: number of times a failed experiment is resubmitted
+        """
+        self.lower = lower
+        self.upper = upper
+        if self.lower > self.upper:
+            raise Exception("lower exp number higher than upper exp number")
+        self.workers = workers
+        self.retries = retries
+        self.completed = []
+        self.failed = []
+        self.exp_manager()
+
+    def exp_manager(self):
+        """
+        each worker takes the next experiment from the shared queue as soon as it is idle. The experiments are queued
+        longest expected run time first, so the long experiments do not end up at the tail of the batch. Each worker
+        saves the result file of its experiment when it completes.
+        :return: void
+        """
+        experimental_params_dict = parameters.get_experiment_grid()
+        if self.upper >= len(experimental_params_dict):
+            raise Exception("upper exp number higher than the number of experiments")
+        pending = sorted(range(self.lower, self.upper + 1),
+                         key=lambda i: self.expected_run_time(params_dict=experimental_params_dict[i]),
+                         reverse=True)
+        attempts = {i: 0 for i in pending}
+        breaks = {i: 0 for i in pending}
+        isolated = []
+        while len(pending) > 0:
+            # a crashed worker breaks the pool, unfinished experiments are resubmitted to a new pool
+            batch, pending = pending, []
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(run_experiment, exp_number=i): i for i in batch}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        future.result()
+                        self.experiment_completed(exp_number=i)
+                    except BrokenProcessPool:
+                        # the pool breaks for all unfinished experiments and the crashed experiment is unknown, the
+                        # unfinished experiments are not charged. Experiments that keep breaking the pool are isolated
+                        breaks[i] += 1
+                        if breaks[i] >= ISOLATION_BREAKS:
+                            isolated.append(i)
+                        else:
+                            pending.append(i)
+                    except Exception as error:
+                        if self.charge_attempt(exp_number=i, error=error, attempts=attempts):
+                            pending.append(i)
+            pending.sort(key=lambda i: self.expected_run_time(params_dict=experimental_params_dict[i]), reverse=True)
+        self.run_isolated(isolated=isolated, attempts=attempts)
+        if len(self.failed) > 0:
+            print(f"failed experiments: {sorted(self.failed)}")
+
+    def run_isolated(self, isolated, attempts):
+        """
+        run the isolated experiments side by side, each on a pool of its own with a single worker. A broken pool is
+        caused by the experiment itself and charged as an attempt
+        :param isolated: list with the experiment numbers
+        :param attempts: number of failed attempts of each experiment
+        :return: void
+        """
+        running = {}
+        try:
+            while len(isolated) > 0 or len(running) > 0:
+                while len(isolated) > 0 and len(running) < self.workers:
+                    i = isolated.pop(0)
+                    executor = ProcessPoolExecutor(max_workers=1)
+                    running[executor.submit(run_experiment, exp_number=i)] = (i, executor)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, executor = running.pop(future)
+                    executor.shutdown(wait=False)
+                    try:
+                        future.result()
+                        self.experiment_completed(exp_number=i)
+                    except Exception as error:
+                        if self.charge_attempt(exp_number=i, error=error, attempts=attempts):
+                            isolated.append(i)
+        finally:
+            for _, executor in running.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+        return
+
+    def experiment_completed(self, exp_number):
+        self.completed.append(exp_number)
+        print(f"experiment {exp_number} completed ({len(self.completed)} of {self.upper - self.lower + 1})")
+        return
+
+    def charge_attempt(self, exp_number, error, attempts):
+        """
+        count a failed attempt of the experiment
+        :return: True if the experiment has attempts left and is resubmitted
+        """
+        attempts[exp_number] += 1
+        if attempts[exp_number] <= self.retries:
+            warnings.warn(f"experiment {exp_number} failed ({error}), attempt {attempts[exp_number]}, resubmitted",
+                          Warning)
+            return True
+        warnings.warn(f"experiment {exp_number} failed ({error}), no attempts left", Warning)
+        self.failed.append(exp_number)
+        return False
+
+    @staticmethod
+    def expected_run_time(params_dict):
+        """
+        relative run time of an experiment, used to queue the long experiments first
+        """
+        run_time = 1
+        if params_dict["release_technique"] == "DRACO":
+            run_time *= 3
+        if params_dict["material_allocation"] == "HB":
+            run_time *= 2
+        if params_dict["material_complexity"] == "random":
+            run_time *= 1.5
+        elif params_dict["material_complexity"] == "multiple":
+            run_time *= 1.2
+        if params_dict["material_replenishment"] == "PoHed":
+            run_time *= 1.2
+        return run_time * params_dict["stations"] / (1 - params_dict["utilization"])
+
+
+def run_experiment(exp_number):
+    """
+    run and save a single experiment, executed in a worker process
+    :param exp_number: experiment number
+    :return: experiment number
+    """
+    Experiment_Manager(exp_number, exp_number)
+    return exp_number
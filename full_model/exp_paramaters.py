@@ -25,10 +25,14 @@ cost_ratios_dict = {'high': {'holding_cost': 0.25, 'WIP_cost': 1, 'earliness_cos
 due_date_dict = {'main': {'v_min': -2.75, 'v_max': 52.25},
                  'sensitivity': {'v_min': -2.75, 'v_max': 27.5}}
 
-experimental_params_dict = []
+# cached registry of the experiment grid, see get_experiment_grid()
+experiment_grid = None
 
 
-def get_interactions():
+def generate_interactions():
+    """
+    generator of the parameter dictionaries of the experiment grid, in order of the experiment number
+    """
     cost_ratio = ['high', 'low', 'moderate']
     """
     dd_setting = 'main'
@@ -55,7 +59,7 @@ def get_interactions():
                     params_dict["tardiness_cost"] = cost_ratios_dict[cr]["tardiness_cost"]
                     params_dict["utilization"] = 0.9
                     params_dict["stations"] = 6
-                    experimental_params_dict.append(params_dict)
+                    yield params_dict
 
     # CONWIP
     for m_complexity in material_complexity:
@@ -81,7 +85,7 @@ def get_interactions():
                         params_dict["tardiness_cost"] = cost_ratios_dict[cr]["tardiness_cost"]
                         params_dict["utilization"] = 0.9
                         params_dict["stations"] = 6
-                        experimental_params_dict.append(params_dict)
+                        yield params_dict
 
     # DRACO
     for m_complexity in material_complexity:
@@ -107,7 +111,7 @@ def get_interactions():
                         params_dict["tardiness_cost"] = cost_ratios_dict[cr]["tardiness_cost"]
                         params_dict["utilization"] = 0.9
                         params_dict["stations"] = 6
-                        experimental_params_dict.append(params_dict)
+                        yield params_dict
     """
     """
     # due date sensitivity experiments 
@@ -135,7 +139,7 @@ def get_interactions():
                     params_dict["tardiness_cost"] = cost_ratios_dict[cr]["tardiness_cost"]
                     params_dict["utilization"] = 0.9
                     params_dict["stations"] = 6
-                    experimental_params_dict.append(params_dict)
+                    yield params_dict
 
     # CONWIP
     for m_complexity in material_complexity:
@@ -161,7 +165,7 @@ def get_interactions():
                         params_dict["tardiness_cost"] = cost_ratios_dict[cr]["tardiness_cost"]
                         params_dict["utilization"] = 0.9
                         params_dict["stations"] = 6
-                        experimental_params_dict.append(params_dict)
+                        yield params_dict
 
     # DRACO
     for m_complexity in material_complexity:
@@ -187,7 +191,7 @@ def get_interactions():
                         params_dict["tardiness_cost"] = cost_ratios_dict[cr]["tardiness_cost"]
                         params_dict["utilization"] = 0.9
                         params_dict["stations"] = 6
-                        experimental_params_dict.append(params_dict)
+                        yield params_dict
     """
 
     """
@@ -220,7 +224,7 @@ def get_interactions():
             params_dict["tardiness_cost"] = cost_ratios_dict[cr]["tardiness_cost"]
             params_dict["utilization"] = 0.9
             params_dict["stations"] = 6
-            experimental_params_dict.append(params_dict)
+            yield params_dict
 
     # DRACO
     adj_DRACO_WIP_target = [*range(12, 41, 2), 50]
@@ -244,7 +248,7 @@ def get_interactions():
             params_dict["tardiness_cost"] = cost_ratios_dict[cr]["tardiness_cost"]
             params_dict["utilization"] = 0.9
             params_dict["stations"] = 6
-            experimental_params_dict.append(params_dict)
+            yield params_dict
     """
     """
     # testing variants
@@ -271,7 +275,7 @@ def get_interactions():
         params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
         params_dict["utilization"] = 0.9
         params_dict["stations"] = 6
-        experimental_params_dict.append(params_dict)
+        yield params_dict
 
     adj_CONWIP_WIP_target = [*range(94, 130, 2), 135, 140, 150, 200]
     for T in adj_CONWIP_WIP_target:
@@ -293,7 +297,7 @@ def get_interactions():
         params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
         params_dict["utilization"] = 0.9
         params_dict["stations"] = 6
-        experimental_params_dict.append(params_dict)
+        yield params_dict
 
     adj_CONWIP_WIP_target = [*range(94, 130, 2), 135, 140, 150, 200]
     for T in adj_CONWIP_WIP_target:
@@ -315,7 +319,7 @@ def get_interactions():
         params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
         params_dict["utilization"] = 0.9
         params_dict["stations"] = 6
-        experimental_params_dict.append(params_dict)
+        yield params_dict
     """
     #"""
     # collect order data
@@ -340,7 +344,7 @@ def get_interactions():
     params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
     params_dict["utilization"] = 0.9
     params_dict["stations"] = 6
-    experimental_params_dict.append(params_dict)
+    yield params_dict
 
     # hierarchical pull
     params_dict = dict()
@@ -361,7 +365,7 @@ def get_interactions():
     params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
     params_dict["utilization"] = 0.9
     params_dict["stations"] = 6
-    experimental_params_dict.append(params_dict)
+    yield params_dict
 
     # centralised integration
     params_dict = dict()
@@ -382,7 +386,7 @@ def get_interactions():
     params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
     params_dict["utilization"] = 0.9
     params_dict["stations"] = 6
-    experimental_params_dict.append(params_dict)
+    yield params_dict
 
     # decentralised integration
     params_dict = dict()
@@ -403,7 +407,7 @@ def get_interactions():
     params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
     params_dict["utilization"] = 0.9
     params_dict["stations"] = 6
-    experimental_params_dict.append(params_dict)
+    yield params_dict
     #"""
     """
     # collect order data
@@ -432,7 +436,7 @@ def get_interactions():
             params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
             params_dict["utilization"] = until
             params_dict["stations"] = m
-            experimental_params_dict.append(params_dict)
+            yield params_dict
 
             # hierarchical pull
             params_dict = dict()
@@ -453,7 +457,7 @@ def get_interactions():
             params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
             params_dict["utilization"] = until
             params_dict["stations"] = m
-            experimental_params_dict.append(params_dict)
+            yield params_dict
 
             # centralised integration
             params_dict = dict()
@@ -474,7 +478,7 @@ def get_interactions():
             params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
             params_dict["utilization"] = until
             params_dict["stations"] = m
-            experimental_params_dict.append(params_dict)
+            yield params_dict
 
             # decentralised integration
             params_dict = dict()
@@ -495,12 +499,88 @@ def get_interactions():
             params_dict["tardiness_cost"] = cost_ratios_dict[cost_ratio]["tardiness_cost"]
             params_dict["utilization"] = until
             params_dict["stations"] = m
-            experimental_params_dict.append(params_dict)
+            yield params_dict
     """
+    return
+
+
+def get_interactions():
+    experimental_params_dict = list(generate_interactions())
     print(len(experimental_params_dict))
     return experimental_params_dict
 
 
+class ExperimentGrid(object):
+    def __init__(self):
+        """
+        registry of the experiment grid. The experiments are built lazily, up to the requested experiment number, and
+        cached. Experiments can be selected by number, or by name and other parameters with filter()
+        """
+        self.experiments = []
+        self.generator = generate_interactions()
+        self.complete = False
+        return
+
+    def build(self, exp_number=None):
+        """
+        build the experiments up to the experiment number
+        :param exp_number: experiment number, None builds the complete grid
+        :return: void
+        """
+        while not self.complete and (exp_number is None or len(self.experiments) <= exp_number):
+            try:
+                self.experiments.append(next(self.generator))
+            except StopIteration:
+                self.complete = True
+        return
+
+    def add(self, params_dict):
+        """
+        register an experiment that is not part of the grid, e.g. a benchmark case
+        :param params_dict: parameter dictionary of the experiment
+        :return: experiment number
+        """
+        self.build()
+        self.experiments.append(params_dict)
+        return len(self.experiments) - 1
+
+    def filter(self, **parameters):
+        """
+        select experiments by their parameters, e.g. filter(name="orderdata", release_technique="DRACO")
+        :return: list with (experiment number, parameter dictionary)
+        """
+        self.build()
+        return [(i, params_dict) for i, params_dict in enumerate(self.experiments)
+                if all(params_dict.get(key) == value for key, value in parameters.items())]
+
+    def __getitem__(self, exp_number):
+        if exp_number < 0:
+            self.build()
+        else:
+            self.build(exp_number=exp_number)
+        if exp_number >= len(self.experiments):
+            raise Exception(f"experiment {exp_number} is not in the experiment grid of {len(self.experiments)} experiments")
+        return self.experiments[exp_number]
+
+    def __len__(self):
+        self.build()
+        return len(self.experiments)
+
+    def __iter__(self):
+        self.build()
+        return iter(self.experiments)
+
+
+def get_experiment_grid():
+    """
+    the experiment grid is built once per process
+    """
+    global experiment_grid
+    if experiment_grid is None:
+        experiment_grid = ExperimentGrid()
+    return experiment_grid
+
+
 # activate the code
 if __name__ == '__main__':
     experimental_params_dict = get_interactions()
@@ -1,7 +1,21 @@
 import numpy as np
 
+# work centre states of an order
+NOT_PASSED = 0
+IN_PROCESS = 1
+PASSED = 2
+
 
 class Order(object):
+    __slots__ = ('sim', 'identifier', 'location', 'attributes', 'name', 'materials', 'requirements',
+                 'material_priority', 'arrival_time', 'material_available_time', 'release_time', 'pool_time',
+                 'completion_time', 'material_replenishment_time', 'inventory_time', 'release', 'material_available',
+                 'first_entry', 'in_inventory', 'routing_sequence_data', 'routing_position', 'process_time',
+                 'process_time_release', 'process_time_cumulative', 'remaining_process_time', 'material_present',
+                 'dispatching_priority', 'queue_entry_time', 'proc_finished_time', 'queue_time', 'order_start_time',
+                 'wc_state', 'planned_manufacturing_lead_time', 'due_date', 'planned_release_time', 'pool_priority',
+                 'ODDs', 'process', 'work_center_RQ')
+
     def __init__(self,
                  simulation,
                  identifier):
@@ -23,7 +37,21 @@ class Order(object):
         if len(material_types) < self.sim.model_panel.material_quantity:
             raise Exception("higher quantity requested than possible")
 
-        if self.sim.model_panel.material_request == "constant":
+        if self.sim.random_streams is not None and self.sim.model_panel.material_request != "no_materials":
+            # buffered selection of the materials
+            if self.sim.model_panel.material_request == "constant":
+                nr_materials = self.sim.model_panel.material_quantity
+            else:
+                nr_materials = self.sim.random_streams.choice(stream='inventory',
+                                                              population=self.sim.model_panel.material_quantity_range,
+                                                              size=1,
+                                                              replace=False)[0]
+            self.requirements = self.sim.random_streams.choice(
+                stream='inventory',
+                population=material_types,
+                size=nr_materials,
+                replace=self.sim.model_panel.material_request == "variable_replace")
+        elif self.sim.model_panel.material_request == "constant":
             self.requirements = self.sim.NP_random_generator['inventory'].choice(a=material_types,
                                                                                  size=self.sim.model_panel.material_quantity,
                                                                                  replace=False
@@ -68,45 +96,44 @@ class Order(object):
 
         # routing sequence params
         if self.sim.model_panel.SHOP_ATTRIBUTES['routing_configuration'] in ["GFS", "PJS"]:
-            self.routing_sequence = self.sim.random_generator.sample(
+            self.routing_sequence_data = self.sim.random_generator.sample(
                 self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT,
                 self.sim.random_generator.randint(1, len(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT)))
             # Sort the routing if necessary
             if self.sim.model_panel.SHOP_ATTRIBUTES['routing_configuration'] == "GFS":
-                self.routing_sequence.sort()  # GFS or PFS require sorted list of stations
+                self.routing_sequence_data.sort()  # GFS or PFS require sorted list of stations
         elif self.sim.model_panel.SHOP_ATTRIBUTES['routing_configuration'] == "PFS":
-            self.routing_sequence = self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT.copy()
+            self.routing_sequence_data = self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT.copy()
         elif self.sim.model_panel.SHOP_ATTRIBUTES['routing_configuration'] == "PJSR":
-            self.routing_sequence = self.sim.random_generator.choices(
+            self.routing_sequence_data = self.sim.random_generator.choices(
                 population=self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT,
                 k=self.sim.random_generator.randint(1, len(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT))
             )
         else:
             raise Exception("no valid manufacturing process selected")
 
-        # Make a variable independent from routing sequence to allow for queue switching
-        self.routing_sequence_data = self.routing_sequence[:]
+        # the routing is not changed, a cursor points at the next operation
+        self.routing_position = 0
 
         # process time
-        self.process_time = {}
-        self.process_time_release = {}
+        number_of_work_centres = len(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT)
+        self.process_time = [0] * number_of_work_centres
+        self.process_time_release = [0] * number_of_work_centres
         self.process_time_cumulative = 0
         self.remaining_process_time = 0
-        self.material_present = self.material_present()
+        self.material_present = self.check_material_present()
 
         # dispatching priority
-        self.dispatching_priority = {}
-        for i, work_centre in enumerate(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT):
-            self.dispatching_priority[work_centre] = 0
+        self.dispatching_priority = [0] * number_of_work_centres
 
         # data collection variables
-        self.queue_entry_time = {}
-        self.proc_finished_time = {}
-        self.queue_time = {}
-        self.order_start_time = {}
-        self.wc_state = {}  # tracks which machine was used
+        self.queue_entry_time = [0] * number_of_work_centres
+        self.proc_finished_time = [0] * number_of_work_centres
+        self.queue_time = [0] * number_of_work_centres
+        self.order_start_time = [0] * number_of_work_centres
+        self.wc_state = [NOT_PASSED] * number_of_work_centres  # tracks which machine was used
 
-        for WC in self.routing_sequence:
+        for WC in self.routing_sequence_data:
             # process time
             if self.sim.model_panel.PROCESS_TIME_DISTRIBUTION == "2_erlang_truncated":
                 self.process_time[WC] = self.sim.general_functions.two_erlang_truncated(
@@ -139,15 +166,9 @@ class Order(object):
             self.process_time_cumulative += self.process_time[WC]
             self.remaining_process_time += self.process_time[WC]
 
-            # order progress data
-            self.queue_entry_time[WC] = 0
-            self.proc_finished_time[WC] = 0
-            self.queue_time[WC] = 0
-            self.order_start_time[WC] = 0
-            self.wc_state[WC] = "NOT_PASSED"
 
         # planned lead time
-        L_M_i = self.sim.general_functions.station_planned_lead_time(r_i=len(self.routing_sequence))
+        L_M_i = self.sim.general_functions.station_planned_lead_time(r_i=len(self.routing_sequence_data))
         self.planned_manufacturing_lead_time = L_M_i
 
         # due date
@@ -173,10 +194,25 @@ class Order(object):
         if self.sim.policy_panel.sequencing_rule in ["PRD"]:
             self.pool_priority = self.planned_release_time
         if self.sim.policy_panel.dispatching_rule == "ODD_land":
-            self.ODDs = {}
+            self.ODDs = [0] * number_of_work_centres
         return
 
-    def material_present(self):
+    @property
+    def routing_sequence(self):
+        """
+        remaining operations of the routing
+        """
+        return self.routing_sequence_data[self.routing_position:]
+
+    @property
+    def next_work_centre(self):
+        return self.routing_sequence_data[self.routing_position]
+
+    @property
+    def remaining_operations(self):
+        return len(self.routing_sequence_data) - self.routing_position
+
+    def check_material_present(self):
         if self.sim.inventory.material_check(order=self, fill_rate_check=True):
             return 1
         else:
@@ -204,6 +240,9 @@ class Order(object):
 
 
 class Material(object):
+    __slots__ = ('sim', 'identifier', 'attributes', 'type', 'name', 'material_arrival_time',
+                 'material_delivery_time', 'material_shipping_time', 'material_commitment_time', 'in_inventory')
+
     def __init__(self,
                  simulation,
                  identifier,
@@ -223,6 +262,7 @@ class Material(object):
         self.material_delivery_time = self.sim.env.now
         self.material_shipping_time = 0
         self.material_commitment_time = 0
+        self.in_inventory = False
 
     def __str__(self):
         return self.name
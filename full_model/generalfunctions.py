@@ -3,12 +3,17 @@ import numpy as np
 import math
 import scipy.stats as st
 
+from leadtimequantiles import get_lead_time_quantiles
+
 
 class GeneralFunctions(object):
     def __init__(self, simulation):
         self.sim = simulation
         self.random_generator = random.Random()
-        self.random_generator.seed(999999)
+        self.random_generator.seed(self.sim.random_seeds['shop'])
+        # memoized planning quantities, these only depend on the panel constants of the experiment
+        self.z_scores = {}
+        self.planned_lead_times = None
         return
 
     @staticmethod
@@ -45,6 +50,8 @@ class GeneralFunctions(object):
         two erlang distribution
         :return: voi
         """
+        if self.sim.random_streams is not None:
+            return self.sim.random_streams.erlang(stream='shop', mean=mean, k=k)
         rate = k / mean
         return_value = 0
         for k in range(0, k):
@@ -60,6 +67,9 @@ class GeneralFunctions(object):
         # pull truncated value
         return_value = np.inf
         while return_value > 4:
+            if self.sim.random_streams is not None:
+                return_value = self.sim.random_streams.erlang(stream='shop', mean=2 / mean_process_time_adj, k=2)
+                continue
             return_value = self.random_generator.expovariate(mean_process_time_adj) + \
                            self.random_generator.expovariate(mean_process_time_adj)
         return return_value
@@ -69,9 +79,13 @@ class GeneralFunctions(object):
         exponential distribution
         :return: void
         """
+        if self.sim.random_streams is not None:
+            return self.sim.random_streams.exponential(stream='shop', mean=mean)
         return self.random_generator.expovariate(lambd=1 / mean)
 
     def uniform(self, mean):
+        if self.sim.random_streams is not None:
+            return self.sim.random_streams.uniform(stream='shop', low=0, high=2 * mean)
         return self.random_generator.uniform(0, 2 * mean)
 
     def random_value_DD(self):
@@ -79,6 +93,10 @@ class GeneralFunctions(object):
         allocate random due date to order
         :return: Due Date value
         """
+        if self.sim.random_streams is not None:
+            return self.sim.env.now + self.sim.random_streams.uniform(stream='shop',
+                                                                      low=self.sim.policy_panel.DD_random_min_max[0],
+                                                                      high=self.sim.policy_panel.DD_random_min_max[1])
         return_value = self.sim.env.now + self.random_generator.uniform(
             self.sim.policy_panel.DD_random_min_max[0],
             self.sim.policy_panel.DD_random_min_max[1]
@@ -90,6 +108,11 @@ class GeneralFunctions(object):
         allocate random due date to order
         :return: Due Date value
         """
+        if self.sim.random_streams is not None:
+            a_i = self.sim.random_streams.uniform(stream='shop',
+                                                  low=self.sim.policy_panel.DD_order_random_min_max[0],
+                                                  high=self.sim.policy_panel.DD_order_random_min_max[1])
+            return self.sim.env.now + a_i + order.planned_manufacturing_lead_time
         a_i = self.random_generator.uniform(
             self.sim.policy_panel.DD_order_random_min_max[0],
             self.sim.policy_panel.DD_order_random_min_max[1]
@@ -128,9 +151,9 @@ class GeneralFunctions(object):
         """
         slack = order.due_date - self.sim.env.now
         if slack >= 0:
-            for WC in order.routing_sequence:
-                order.ODDs[WC] = self.sim.env.now + (order.routing_sequence.index(WC) + 1) * \
-                                 (slack / len(order.routing_sequence))
+            remaining_routing = order.routing_sequence
+            for j, WC in enumerate(remaining_routing):
+                order.ODDs[WC] = self.sim.env.now + (j + 1) * (slack / len(remaining_routing))
         else:
             for WC in order.routing_sequence:
                 order.ODDs[WC] = self.sim.env.now
@@ -155,9 +178,50 @@ class GeneralFunctions(object):
         return mean_r * (mean_p + mean_q)
 
     def z_score(self, prob):
-        return st.norm.ppf(prob)
+        if prob not in self.z_scores:
+            self.z_scores[prob] = st.norm.ppf(prob)
+        return self.z_scores[prob]
 
     def station_planned_lead_time(self, r_i):
+        """
+        planned lead time of an order with r_i stations in the routing, taken from a table that is built once per
+        experiment for the routing lengths 1..m
+        :param r_i: routing length
+        :return: planned manufacturing lead time
+        """
+        if self.planned_lead_times is None:
+            self.planned_lead_times = {}
+            for r in range(1, len(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT) + 1):
+                self.planned_lead_times[r] = self.planned_lead_time_estimate(r_i=r)
+        if r_i in self.planned_lead_times:
+            return self.planned_lead_times[r_i]
+        return self.planned_lead_time_estimate(r_i=r_i)
+
+    def planned_lead_time_estimate(self, r_i):
+        if self.sim.model_panel.PLANNED_LEAD_TIME == 'analytical':
+            return self.compute_station_planned_lead_time(r_i=r_i)
+        elif self.sim.model_panel.PLANNED_LEAD_TIME == 'simulated':
+            return self.simulated_station_planned_lead_time(r_i=r_i)
+        raise Exception("no valid planned lead time procedure selected")
+
+    def simulated_station_planned_lead_time(self, r_i):
+        """
+        planned lead time from the cache of simulated lead time quantiles
+        :param r_i: routing length
+        :return: planned manufacturing lead time
+        """
+        c_e = self.sim.model_panel.earliness_cost
+        c_t = self.sim.model_panel.tardiness_cost
+        quantiles = get_lead_time_quantiles(file=self.sim.model_panel.LEAD_TIME_CACHE)
+        return quantiles.quantile(utilization=self.sim.model_panel.AIMED_UTILIZATION,
+                                  stations=len(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT),
+                                  routing_length=r_i,
+                                  process_time_distribution=self.sim.model_panel.PROCESS_TIME_DISTRIBUTION,
+                                  routing_configuration=self.sim.model_panel.SHOP_ATTRIBUTES['routing_configuration'],
+                                  mean_process_time=self.sim.model_panel.MEAN_PROCESS_TIME,
+                                  probability=c_t / (c_t + c_e))
+
+    def compute_station_planned_lead_time(self, r_i):
         """
         old procedure
         alpha = 1 / 0.5**2      # shape ==  1/CV^2 process time distribution
@@ -1,3 +1,4 @@
+from heapq import heappush, heappop
 from random import Random
 from flowitem import Material
 
@@ -10,15 +11,47 @@ class Generation(object):
         """
         self.sim = simulation
         self.random_generator = Random()
-        self.random_generator.seed(999999)
+        self.random_generator.seed(self.sim.random_seeds['generation'])
 
         # key params
         self.i = 1
         self.generation_technique = self.sim.policy_panel.generation_technique
         self.generation_attributes = self.sim.policy_panel.generation_attributes
 
+        # running aggregates of the pool demand, updated on pool entry and exit
+        material_types = self.sim.model_panel.materials.keys()
+        self.due_demand = CrossedDemand(material_types=material_types)
+        self.advance_demand = CrossedDemand(material_types=material_types)
         return
 
+    def pool_entry(self, order):
+        for material, quantity in self.requirement_quantities(order=order).items():
+            # backorder, demand that passed the planned release time
+            self.due_demand.add(identifier=order.identifier,
+                                material=material,
+                                quantity=quantity,
+                                threshold=order.planned_release_time)
+            # pooled hedging, demand within the replenishment lead time
+            L_R_k = self.sim.model_panel.materials[material]['expected_lead_time']
+            self.advance_demand.add(identifier=order.identifier,
+                                    material=material,
+                                    quantity=quantity,
+                                    threshold=order.planned_release_time - L_R_k)
+        return
+
+    def pool_exit(self, order):
+        for material in set(order.requirements):
+            self.due_demand.remove(identifier=order.identifier, material=material)
+            self.advance_demand.remove(identifier=order.identifier, material=material)
+        return
+
+    @staticmethod
+    def requirement_quantities(order):
+        quantities = {}
+        for requirement in order.requirements:
+            quantities[requirement] = quantities.get(requirement, 0) + 1
+        return quantities
+
     def initialize_generation(self):
         for item_type, generation in self.generation_technique.items():
             if generation == 'order_up_to':
@@ -130,23 +163,10 @@ class Generation(object):
     def pooled_hedging(self):
         # specify material needs for each item
         advance_replenishments = {}
+        crossed = self.advance_demand.update(now=self.sim.env.now)
         for item_type, material in self.sim.model_panel.materials.items():
-            advance_replenishments[item_type] = 0
-        # no material needs
-        if len(self.sim.model_panel.POOLS.items) == 0:
-            return advance_replenishments
-        # determine the material needs
-        pool_list = self.sim.model_panel.POOLS.items
-        for pool_item in pool_list:
-            order = pool_item[self.sim.release.index_order_object]
-            # check if the order requires this material type
-            for requirement in order.requirements:
-                # check if pool time is within replenishment lead time
-                L_R_k = self.sim.model_panel.materials[requirement]['expected_lead_time']
-                # check if replenishment is necessary
-                if order.planned_release_time - L_R_k <= self.sim.env.now:
-                    advance_replenishments[requirement] += 1
-                # else: early demand, do not replenish
+            # pool demand within the replenishment lead time; early demand is not replenished
+            advance_replenishments[item_type] = crossed[item_type]
         return advance_replenishments
 
     def pooled_hedging_input_check(self, order):
@@ -169,21 +189,56 @@ class Generation(object):
 
     def backorder(self):
         # specify material needs for each item
-        on_hand = {}
         backorders = {}
+        crossed = self.due_demand.update(now=self.sim.env.now)
         for item_type, material in self.sim.model_panel.materials.items():
-            on_hand[item_type] = self.sim.inventory.on_hand_inventory[item_type]
-            backorders[item_type] = 0
-        # no material needs
-        if len(self.sim.model_panel.POOLS.items) == 0:
-            return backorders
-        # determine the material needs
-        pool_list = self.sim.model_panel.POOLS.items
-        for pool_item in pool_list:
-            order = pool_item[self.sim.release.index_order_object]
-            # check if the order requires this material type
-            for requirement in order.requirements:
-                # check if replenishment is necessary
-                if order.planned_release_time <= self.sim.env.now and on_hand[requirement] == 0:
-                    backorders[requirement] += 1
+            # pool demand past its planned release time counts only if the item is out of stock
+            if self.sim.inventory.on_hand_inventory[item_type] == 0:
+                backorders[item_type] = crossed[item_type]
+            else:
+                backorders[item_type] = 0
         return backorders
+
+
+class CrossedDemand(object):
+    def __init__(self, material_types):
+        """
+        running count, per material, of the pool demand whose threshold time has passed.
+        pending demand is kept in a heap on threshold time and moved to the count when the time has passed;
+        demand that leaves the pool before that is skipped (lazy deletion)
+        :param material_types: the material types
+        """
+        self.crossed = {}
+        for material in material_types:
+            self.crossed[material] = 0
+        self.pending = []
+        self.quantity = {}
+        self.state = {}
+        self.counter = 0
+        return
+
+    def add(self, identifier, material, quantity, threshold):
+        self.quantity[(identifier, material)] = quantity
+        self.state[(identifier, material)] = 'pending'
+        heappush(self.pending, (threshold, self.counter, identifier, material))
+        self.counter += 1
+        return
+
+    def remove(self, identifier, material):
+        quantity = self.quantity.pop((identifier, material))
+        if self.state.pop((identifier, material)) == 'crossed':
+            self.crossed[material] -= quantity
+        return
+
+    def update(self, now):
+        """
+        move the demand with a threshold time up to now to the running count
+        :param now: current time
+        :return: running count for each material
+        """
+        while len(self.pending) > 0 and self.pending[0][0] <= now:
+            _, _, identifier, material = heappop(self.pending)
+            if self.state.get((identifier, material)) == 'pending':
+                self.state[(identifier, material)] = 'crossed'
+                self.crossed[material] += self.quantity[(identifier, material)]
+        return self.crossed
@@ -1,3 +1,4 @@
+from bisect import bisect_left, insort
 from operator import itemgetter
 
 
@@ -13,17 +14,31 @@ class Inventory(object):
         self.index_priority = self.sim.model_panel.index_priority
         self.materials = self.sim.model_panel.materials
         self.material_allocation = self.sim.policy_panel.material_allocation
-        self.material_sequence = {}
+        # rationing sequence of each material, kept up to date on pool entry and exit
+        self.rationing_sequence = {}
+        for material in self.materials:
+            self.rationing_sequence[material] = RationingSequence()
 
         self.on_hand_inventory = {}
         for material in self.materials:
             self.on_hand_inventory[material] = 0
+        self.total_on_hand = 0
+
+        # event-driven availability, only for allocation policies that do not depend on the pool sequence
+        self.material_availability = None
+        if self.material_allocation == 'NHB':
+            self.material_availability = MaterialAvailability(inventory=self)
         return
 
     def put_in_inventory(self, material):
         inventory_item = self.inventory_item(material=material)
         self.sim.model_panel.SKU[material.type].put(inventory_item)
         self.on_hand_inventory[material.type] += 1
+        self.total_on_hand += 1
+        if self.material_availability is not None:
+            self.material_availability.stock_update(material=material.type, change=1)
+        if self.sim.data.state_recorder is not None:
+            self.sim.data.state_recorder.update()
         # update state
         material.in_inventory = True
         # update as material has arrived
@@ -49,6 +64,11 @@ class Inventory(object):
         self.sim.model_panel.SKU[material].items.sort(key=itemgetter(self.index_sorting_removal))
         self.sim.model_panel.SKU[material].get()
         self.on_hand_inventory[material] -= 1
+        self.total_on_hand -= 1
+        if self.material_availability is not None:
+            self.material_availability.stock_update(material=material, change=-1)
+        if self.sim.data.state_recorder is not None:
+            self.sim.data.state_recorder.update()
 
         # update generation process
         self.sim.generation.check_generation(item_type=material)
@@ -104,7 +124,7 @@ class Inventory(object):
             for material in requirements:
                 # allocate material based on allocation policy
                 if self.material_allocation == 'HB' and not fill_rate_check:
-                    inventory_level = self.material_sequence[material][order.identifier]
+                    inventory_level = self.rationing_sequence[material].position(identifier=order.identifier)
                 elif self.material_allocation == 'NHB':
                     if self.sim.model_panel.material_request == 'variable_replace':
                         # correct for lumpiness in demand
@@ -145,27 +165,149 @@ class Inventory(object):
             self.sim.release.activate_release(material_arrival=True)
         return
 
-    def rationing_sequence_update(self):
-        # sort the pool
-        pool = self.sim.model_panel.POOLS.items.copy()
-        pool.sort(key=itemgetter(self.sim.release.index_material_priority))
-        # update rationing sequence for each material type k
-        for material in self.materials:
-            # check for each order in the pool
-            self.material_sequence[material] = {}
-            nr_in_sequence = 0
-            for i, pool_order in enumerate(pool):
-                order = pool_order[self.index_order_object]
-                # material check
-                if material in order.requirements:
-                    # check material quantity
-                    if self.sim.model_panel.material_request == 'variable_replace':
-                        # correct for lumpiness in demand
-                        nr_in_sequence += len([om for om in order.requirements if om == material])
-                    else:
-                        nr_in_sequence += 1
-                    # save sequence position
-                    self.material_sequence[material][order.identifier] = nr_in_sequence
-            # entire pool established
-            self.material_sequence[material]['total_demand'] = nr_in_sequence
+    def rationing_sequence_add(self, order, pool_key):
+        """
+        add an order to the rationing sequence of each material it requires
+        :param order: order object
+        :param pool_key: the pool sequence key, used to break ties in material priority
+        """
+        quantity = {}
+        for material in order.requirements:
+            if self.sim.model_panel.material_request == 'variable_replace':
+                # correct for lumpiness in demand
+                quantity[material] = quantity.get(material, 0) + 1
+            else:
+                quantity[material] = 1
+        for material, amount in quantity.items():
+            self.rationing_sequence[material].add(identifier=order.identifier,
+                                                  key=(order.material_priority, pool_key),
+                                                  quantity=amount)
         return
+
+    def rationing_sequence_remove(self, order):
+        for material in set(order.requirements):
+            self.rationing_sequence[material].remove(identifier=order.identifier)
+        return
+
+class MaterialAvailability(object):
+    def __init__(self, inventory):
+        """
+        tracks which pool orders have all their materials available. The state is only updated when an order enters
+        or leaves the pool, or when the stock of a material changes.
+        :param inventory: inventory object
+        """
+        self.inventory = inventory
+        self.sim = inventory.sim
+        self.threshold = 0
+        # per SKU: the number of pool orders blocked by it, and the waiting orders grouped by requested amount
+        self.blocked_count = {}
+        self.waiting = {}
+        for material in self.inventory.materials:
+            self.blocked_count[material] = 0
+            self.waiting[material] = {}
+        # per order: the requested amount of each SKU and the number of SKUs blocking it
+        self.demand = {}
+        self.blocking = {}
+        # orders in the pool with all materials available
+        self.ready = set()
+        return
+
+    def amount_available(self, material):
+        return self.inventory.on_hand_inventory[material] - self.threshold
+
+    def order_demand(self, order):
+        demand = {}
+        for material in order.requirements:
+            if self.sim.model_panel.material_request == 'variable_replace':
+                # correct for lumpiness in demand
+                demand[material] = demand.get(material, 0) + 1
+            else:
+                demand[material] = 1
+        return demand
+
+    def add_order(self, order):
+        identifier = order.identifier
+        demand = self.order_demand(order=order)
+        self.demand[identifier] = demand
+        blocking = 0
+        for material, amount in demand.items():
+            if amount not in self.waiting[material]:
+                self.waiting[material][amount] = set()
+            self.waiting[material][amount].add(identifier)
+            if self.amount_available(material=material) < amount:
+                self.blocked_count[material] += 1
+                blocking += 1
+        self.blocking[identifier] = blocking
+        if blocking == 0:
+            self.ready.add(identifier)
+        return
+
+    def remove_order(self, order):
+        identifier = order.identifier
+        for material, amount in self.demand.pop(identifier).items():
+            self.waiting[material][amount].discard(identifier)
+            if self.amount_available(material=material) < amount:
+                self.blocked_count[material] -= 1
+        del self.blocking[identifier]
+        self.ready.discard(identifier)
+        return
+
+    def stock_update(self, material, change):
+        """
+        update the availability after the stock of a material changed by one unit.
+        only the orders that request exactly the crossed amount change state
+        :param material: material type
+        :param change: +1 for a receipt, -1 for an issue
+        """
+        available = self.amount_available(material=material)
+        if change > 0:
+            # orders requesting the new level become unblocked for this material
+            for identifier in self.waiting[material].get(available, ()):
+                self.blocked_count[material] -= 1
+                self.blocking[identifier] -= 1
+                if self.blocking[identifier] == 0:
+                    self.ready.add(identifier)
+        else:
+            # orders requesting the old level become blocked for this material
+            for identifier in self.waiting[material].get(available + 1, ()):
+                self.blocked_count[material] += 1
+                if self.blocking[identifier] == 0:
+                    self.ready.discard(identifier)
+                self.blocking[identifier] += 1
+        return
+
+
+class RationingSequence(object):
+    def __init__(self):
+        """
+        the rationing sequence of one material: the pool orders requiring it sorted on material priority.
+        The position of an order is the cumulative quantity requested up to and including the order.
+        """
+        self.keys = []
+        self.key = {}
+        self.quantity = {}
+        self.unit_quantities = True
+        self.total_demand = 0
+        return
+
+    def add(self, identifier, key, quantity):
+        insort(self.keys, (key, identifier))
+        self.key[identifier] = key
+        self.quantity[identifier] = quantity
+        self.total_demand += quantity
+        if quantity != 1:
+            self.unit_quantities = False
+        return
+
+    def remove(self, identifier):
+        key = self.key.pop(identifier)
+        del self.keys[bisect_left(self.keys, (key, identifier))]
+        self.total_demand -= self.quantity.pop(identifier)
+        return
+
+    def position(self, identifier):
+        index = bisect_left(self.keys, (self.key[identifier], identifier))
+        if self.unit_quantities:
+            return index + 1
+        # lumpy demand, sum the quantities up to the order
+        return sum(self.quantity[entry[-1]] for entry in self.keys[:index + 1])
@@ -0,0 +1,92 @@
+import json
+import os
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+# version of the cache format and of the simulation producing it, older caches must be rebuilt
+CACHE_VERSION = 2
+# default location of the cache, built with test_model/set_lt_quantile_cache.py
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lead_time_quantiles.json')
+# loaded caches, each file is read once per process
+loaded_caches = {}
+
+
+def table_key(stations, process_time_distribution, routing_configuration, mean_process_time):
+    """
+    :return: key of the table of a shop, the quantiles only hold for the shop they are simulated for
+    """
+    return f"{routing_configuration}_{stations}_{process_time_distribution}_{float(mean_process_time):g}"
+
+
+def save_cache(file, tables, settings):
+    """
+    save the simulated quantiles
+    :param file: path of the json file
+    :param tables: dictionary with the table of each table_key, with the utilization levels, routing lengths,
+    probabilities and the quantiles as nested lists [utilization][routing length][probability]
+    :param settings: settings of the simulation that produced the quantiles
+    :return: void
+    """
+    with open(file, 'w') as cache_file:
+        json.dump({'version': CACHE_VERSION, 'settings': settings, 'tables': tables}, cache_file, indent=1)
+    return
+
+
+class LeadTimeQuantiles(object):
+    def __init__(self, file=CACHE_FILE):
+        """
+        persisted cache of simulated manufacturing lead time quantiles of the general flow shop, for each utilization,
+        routing length and probability. The probability follows from the cost ratio, c_t / (c_t + c_e).
+        Values between the simulated points are interpolated linearly
+        :param file: path of the json file
+        """
+        if not os.path.exists(file):
+            raise Exception(f"no lead time quantile cache found at {file}, build it with set_lt_quantile_cache.py")
+        with open(file) as cache_file:
+            cache = json.load(cache_file)
+        if cache.get('version') != CACHE_VERSION:
+            raise Exception(f"the lead time quantile cache {file} has version {cache.get('version')}, "
+                            f"version {CACHE_VERSION} is required. Rebuild it with set_lt_quantile_cache.py")
+        self.file = file
+        self.settings = cache['settings']
+        self.tables = cache['tables']
+        self.interpolators = {}
+        return
+
+    def get_interpolator(self, stations, process_time_distribution, routing_configuration, mean_process_time):
+        key = table_key(stations=stations,
+                        process_time_distribution=process_time_distribution,
+                        routing_configuration=routing_configuration,
+                        mean_process_time=mean_process_time)
+        if key not in self.interpolators:
+            if key not in self.tables:
+                raise Exception(f"the lead time quantile cache has no table for a {routing_configuration} shop with "
+                                f"{stations} stations and {process_time_distribution} process times with mean "
+                                f"{mean_process_time}")
+            table = self.tables[key]
+            self.interpolators[key] = RegularGridInterpolator(
+                (np.array(table['utilization']), np.array(table['routing_length']), np.array(table['probability'])),
+                np.array(table['quantiles']))
+        return self.interpolators[key]
+
+    def quantile(self, utilization, stations, routing_length, process_time_distribution, routing_configuration,
+                 mean_process_time, probability):
+        """
+        :return: interpolated lead time quantile of an order with the routing length
+        """
+        interpolator = self.get_interpolator(stations=stations,
+                                             process_time_distribution=process_time_distribution,
+                                             routing_configuration=routing_configuration,
+                                             mean_process_time=mean_process_time)
+        try:
+            return float(interpolator((utilization, routing_length, probability)))
+        except ValueError:
+            raise Exception(f"utilization {utilization}, routing length {routing_length} or probability "
+                            f"{probability} is outside the lead time quantile cache")
+
+
+def get_lead_time_quantiles(file=CACHE_FILE):
+    if file not in loaded_caches:
+        loaded_caches[file] = LeadTimeQuantiles(file=file)
+    return loaded_caches[file]
@@ -1,5 +1,6 @@
 from operator import itemgetter
 import random
+from flowitem import IN_PROCESS, PASSED
 
 
 class Process(object):
@@ -13,12 +14,11 @@ class Process(object):
         self.index_order_object = self.sim.model_panel.index_order_object
         self.index_priority = self.sim.model_panel.index_priority
         self.dispatching_rule = self.sim.policy_panel.dispatching_rule
+        self.queue_mode = self.sim.model_panel.QUEUE_MODE
         self.random_generator = random.Random()
-        self.random_generator.seed(999999)
+        self.random_generator.seed(self.sim.random_seeds['process'])
 
-        self.work_centre_occupied = {}
-        for work_centre in self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT:
-            self.work_centre_occupied[work_centre] = False
+        self.work_centre_occupied = [False] * len(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT)
         return
 
     def put_in_queue(self, order, dispatch=True):
@@ -39,8 +39,11 @@ class Process(object):
                 self.sim.general_functions.ODD_land_adaption(order=order)
 
         # get work centre
-        work_centre = order.routing_sequence[0]
+        work_centre = order.next_work_centre
         order.queue_entry_time[work_centre] = self.sim.env.now
+        # update the order book, if necessary
+        if self.sim.policy_panel.release_technique == "DRACO" or self.dispatching_rule == "FOCUS":
+            self.sim.system_state_dispatching.update_order_book(order=order)
 
         # put the order in the queue
         queue_item = self.queue_item(order=order, work_centre=work_centre)
@@ -53,18 +56,22 @@ class Process(object):
         return
 
     def starvation_dispatch(self):
-        for work_centre in self.sim.model_panel.WORK_CENTRES.keys():
+        for work_centre in self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT:
             if len(self.sim.model_panel.WORK_CENTRES[work_centre].users) == 0:
                 pass
                 self.dispatch_order(work_centre=work_centre)
         return
 
-    def release_from_queue(self, work_centre):
+    def release_from_queue(self, work_centre, order):
         """
         removes an order from the queue
         :param work_centre: work_center number indicating the number of the capacity source
+        :param order: order object
         :return: void
         """
+        if self.queue_mode == 'heap':
+            self.sim.model_panel.QUEUES[work_centre].remove(identifier=order.identifier)
+            return
         # sort the queue
         self.sim.model_panel.QUEUES[work_centre].items.sort(key=itemgetter(self.index_sorting_removal))
         self.sim.model_panel.QUEUES[work_centre].get()
@@ -114,18 +121,18 @@ class Process(object):
         queue_item = [1,  # removal integer
                       order,  # order object
                       order.dispatching_priority[work_centre],  # order priority
-                      order.routing_sequence[0]  # next operation
+                      order.next_work_centre  # next operation
                       ]
         return queue_item
 
     def dispatch(self, order, work_centre):
         # remove from the queue
-        self.release_from_queue(work_centre=work_centre)
+        self.release_from_queue(work_centre=work_centre, order=order)
 
         # set params and start process
         self.work_centre_occupied[work_centre] = True
         order.process = self.sim.env.process(
-            self.sim.process.capacity_process(order=order, work_centre=order.routing_sequence[0]))
+            self.sim.process.capacity_process(order=order, work_centre=order.next_work_centre))
         return
 
     def dispatch_order(self, work_centre):
@@ -159,9 +166,16 @@ class Process(object):
         :return: order, boolean: break_loop, boolean: free_load
         """
         # if there are no items in the queue, return
-        if len(self.sim.model_panel.QUEUES[work_centre].items) == 0:
+        if len(self.sim.model_panel.QUEUES[work_centre]) == 0:
             return None, True
 
+        # the heap keeps the queue sorted on the static priority rules
+        if self.queue_mode == 'heap' and self.dispatching_rule != "FOCUS":
+            order_item = self.sim.model_panel.QUEUES[work_centre].most_urgent()
+            self.update_priority(order=order_item[self.index_order_object], work_centre=work_centre)
+            order_item[self.index_sorting_removal] = 0
+            return order_item, False
+
         # update queue list depending on dispatching mode
         if self.dispatching_rule == "FOCUS":
             queue_list = self.sim.model_panel.QUEUES[work_centre].items
@@ -203,7 +217,7 @@ class Process(object):
         order.order_start_time[work_centre] = self.sim.env.now
 
         # start processing, update order state
-        order.wc_state[work_centre] = "IN_PROCESS"
+        order.wc_state[work_centre] = IN_PROCESS
         # yield a request
         with req as req:
             yield req
@@ -213,15 +227,15 @@ class Process(object):
             self.work_centre_occupied[work_centre] = False
 
         # update order state
-        order.wc_state[work_centre] = "PASSED"
+        order.wc_state[work_centre] = PASSED
 
-        # update the routing list to avoid re-entrance
-        order.routing_sequence.remove(work_centre)
+        # move the routing cursor to the next operation
+        order.routing_position += 1
         # collect data
         self.data_collection_intermediate(order=order, work_center=work_centre)
 
         # next action for the order
-        if len(order.routing_sequence) == 0:
+        if order.remaining_operations == 0:
             # order completed, collect data, the completion time
             order.completion_time = self.sim.env.now
             # general data collection
@@ -266,28 +280,25 @@ class Process(object):
         """
         # update order data
         order.update_material_data()
-        # print(order.release_time)
-        # setup list
-        df_list = list()
-        df_list.append(order.identifier)
-        df_list.append(order.name)
-        df_list.append(order.completion_time - order.arrival_time)
-        df_list.append(order.pool_time)
-        df_list.append(order.completion_time - order.release_time)
-        df_list.append(order.completion_time - order.due_date)
-        df_list.append(max(0, (order.completion_time - order.due_date)))
-        df_list.append(max(0, -(order.completion_time - order.due_date)))
-        df_list.append(max(0, self.heavenside(x=(order.completion_time - order.due_date))))
-        df_list.append(order.material_available_time - order.arrival_time)
-        df_list.append(order.material_replenishment_time)
-        df_list.append(order.inventory_time)
-        df_list.append(order.material_present)
-        df_list.append(len(order.routing_sequence_data))
-        df_list.append(len(order.requirements))
-        df_list.append(max(0, self.heavenside(x=(order.release_time - order.planned_release_time))))
-
-        # save list
-        self.sim.data.append_run_list(result_list=df_list)
+        # write the results in the order result buffer
+        lateness = order.completion_time - order.due_date
+        self.sim.data.append_run_list(result_list=(
+            order.identifier,
+            order.completion_time - order.arrival_time,
+            order.pool_time,
+            order.completion_time - order.release_time,
+            lateness,
+            max(0, lateness),
+            max(0, -lateness),
+            max(0, self.heavenside(x=lateness)),
+            order.material_available_time - order.arrival_time,
+            order.material_replenishment_time,
+            order.inventory_time,
+            order.material_present,
+            len(order.routing_sequence_data),
+            len(order.requirements),
+            max(0, self.heavenside(x=(order.release_time - order.planned_release_time)))
+        ))
         return
 
     @staticmethod
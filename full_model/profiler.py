@@ -0,0 +1,157 @@
+import inspect
+import time
+import pandas as pd
+
+# peak memory is only available on unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# profiled subsystems: attribute of the simulation object, method and name in the report
+SUBSYSTEMS = [
+    ('release', 'release', 'Release.release'),
+    ('inventory', 'material_check', 'Inventory.material_check'),
+    ('system_state_dispatching', 'full_control_mode', 'SystemStateDispatching.full_control_mode'),
+    ('generation', 'generate_control_loop', 'Generation.generate_control_loop'),
+    ('process', 'capacity_process', 'Process.capacity_process'),
+    ('process', 'data_collection_intermediate', 'data collection'),
+    ('process', 'data_collection_final', 'data collection'),
+    ('data', 'run_update', 'data collection'),
+]
+
+
+class Profiler(object):
+    def __init__(self, simulation):
+        """
+        records the cumulative time and number of calls of the subsystems of a simulation model, and the number of
+        SimPy events. The time of a subsystem is its self time, the time of the profiled subsystems it calls is
+        excluded. The methods are only wrapped when the profiler is instrumented, a model without profiler runs the
+        original methods
+        :param simulation: simulation object
+        """
+        self.sim = simulation
+        self.time = {}
+        self.calls = {}
+        # time of the nested profiled calls of each active profiled call
+        self.nested_time = []
+        self.events = 0
+        self.start_time = None
+        self.wall_time = 0
+        return
+
+    def instrument(self):
+        """
+        wrap the methods of the subsystems and the step function of the environment
+        :return: void
+        """
+        for owner_name, method_name, name in SUBSYSTEMS:
+            owner = getattr(self.sim, owner_name)
+            method = getattr(owner, method_name)
+            self.time.setdefault(name, 0)
+            self.calls.setdefault(name, 0)
+            if inspect.isgeneratorfunction(method):
+                setattr(owner, method_name, self.profile_generator(name=name, method=method))
+            else:
+                setattr(owner, method_name, self.profile_function(name=name, method=method))
+        step = self.sim.env.step
+
+        def counting_step():
+            self.events += 1
+            return step()
+        self.sim.env.step = counting_step
+        return
+
+    def enter(self):
+        self.nested_time.append(0)
+        return time.perf_counter()
+
+    def exit(self, name, start):
+        """
+        add the self time of a profiled call to the subsystem and its total time to the calling subsystem
+        """
+        elapsed = time.perf_counter() - start
+        self.time[name] += elapsed - self.nested_time.pop()
+        self.calls[name] += 1
+        if len(self.nested_time) > 0:
+            self.nested_time[-1] += elapsed
+        return
+
+    def profile_function(self, name, method):
+        def wrapper(*args, **kwargs):
+            start = self.enter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.exit(name=name, start=start)
+        return wrapper
+
+    def profile_generator(self, name, method):
+        """
+        SimPy processes are profiled per resumption, the time the process waits on its events is excluded
+        """
+        def wrapper(*args, **kwargs):
+            generator = method(*args, **kwargs)
+            resume, value = generator.send, None
+            while True:
+                start = self.enter()
+                try:
+                    event = resume(value)
+                except StopIteration as stop:
+                    self.exit(name=name, start=start)
+                    return stop.value
+                except BaseException:
+                    self.exit(name=name, start=start)
+                    raise
+                self.exit(name=name, start=start)
+                try:
+                    value = yield event
+                    resume = generator.send
+                except GeneratorExit:
+                    generator.close()
+                    raise
+                except BaseException as error:
+                    # interrupts are passed to the process
+                    resume, value = generator.throw, error
+        return wrapper
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        return
+
+    def stop(self):
+        self.wall_time = time.perf_counter() - self.start_time
+        return
+
+    def report(self):
+        """
+        :return: DataFrame with the self time and calls of each subsystem, followed by the totals of the simulation
+        """
+        rows = []
+        for name in self.time.keys():
+            rows.append([name, self.calls[name], self.time[name],
+                         self.time[name] / self.wall_time * 100 if self.wall_time > 0 else 0,
+                         self.time[name] / self.calls[name] * 1e6 if self.calls[name] > 0 else 0])
+        rows.append(['events', self.events, self.wall_time, 100,
+                     self.wall_time / self.events * 1e6 if self.events > 0 else 0])
+        report = pd.DataFrame(rows, columns=['subsystem', 'calls', 'self_time_s', 'share_%', 'time_per_call_us'])
+        report['events_per_s'] = self.events / self.wall_time if self.wall_time > 0 else 0
+        report['peak_rss_mb'] = self.peak_memory()
+        return report
+
+    @staticmethod
+    def peak_memory():
+        """
+        :return: peak resident set size of the process in MB, None if unknown
+        """
+        if resource is None:
+            return None
+        # kilobytes on linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 1)
+
+    def save_report(self, file):
+        report = self.report()
+        report.to_csv(file, index=False)
+        print(f"\nprofile of experiment {self.sim.model_panel.experiment_name}:")
+        print(report.round(3).to_string(index=False))
+        return
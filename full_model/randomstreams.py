@@ -0,0 +1,111 @@
+import numpy as np
+
+# numpy random number streams with buffered variates, each seeded separately
+BUFFERED_STREAMS = ['shop', 'demand', 'inventory', 'supply']
+
+
+class VariateBuffer(object):
+    def __init__(self, generator, draw, block_size):
+        """
+        hands out the variates of a numpy generator one at a time, drawn in blocks
+        :param generator: numpy Generator of the stream
+        :param draw: function drawing an array of variates, called as draw(generator, size)
+        :param block_size: number of variates drawn at once
+        """
+        self.generator = generator
+        self.draw = draw
+        self.block_size = block_size
+        self.values = iter(())
+        return
+
+    def next(self):
+        try:
+            return next(self.values)
+        except StopIteration:
+            self.values = iter(self.draw(self.generator, self.block_size).tolist())
+            return next(self.values)
+
+
+class RandomStreams(object):
+    def __init__(self, simulation):
+        """
+        buffered random variates for the shop floor, demand, inventory and supply streams. Each stream has its own
+        generator, spawned from the seed sequence of the model, and its own buffer per type of variate
+        :param simulation: simulation object
+        """
+        self.sim = simulation
+        self.block_size = self.sim.model_panel.VARIATE_BLOCK_SIZE
+        seeds = self.sim.seed_sequence.spawn(len(BUFFERED_STREAMS))
+        self.generators = {stream: np.random.default_rng(seeds[s]) for s, stream in enumerate(BUFFERED_STREAMS)}
+        self.buffers = {}
+        return
+
+    def reseed(self):
+        """
+        replace the state of the generators in place with the streams of the current seed sequence of the model, the
+        variates left in the buffers are discarded
+        """
+        seeds = self.sim.seed_sequence.spawn(len(BUFFERED_STREAMS))
+        for s, stream in enumerate(BUFFERED_STREAMS):
+            self.generators[stream].bit_generator.state = np.random.default_rng(seeds[s]).bit_generator.state
+        for buffer in self.buffers.values():
+            buffer.values = iter(())
+        return
+
+    def get_buffer(self, stream, variate, draw):
+        key = (stream, variate)
+        if key not in self.buffers:
+            self.buffers[key] = VariateBuffer(generator=self.generators[stream], draw=draw, block_size=self.block_size)
+        return self.buffers[key]
+
+    def erlang(self, stream, mean, k):
+        """
+        k-erlang variate, scaled from a standard gamma variate with shape k
+        """
+        key = (stream, f'gamma_{k}')
+        if key not in self.buffers:
+            self.get_buffer(stream=stream, variate=f'gamma_{k}', draw=lambda g, size: g.standard_gamma(k, size))
+        return self.buffers[key].next() * mean / k
+
+    def exponential(self, stream, mean):
+        key = (stream, 'exponential')
+        if key not in self.buffers:
+            self.get_buffer(stream=stream, variate='exponential', draw=lambda g, size: g.standard_exponential(size))
+        return self.buffers[key].next() * mean
+
+    def uniform(self, stream, low, high):
+        key = (stream, 'uniform')
+        if key not in self.buffers:
+            self.get_buffer(stream=stream, variate='uniform', draw=lambda g, size: g.random(size))
+        return low + (high - low) * self.buffers[key].next()
+
+    def normal(self, stream, loc, scale):
+        key = (stream, 'normal')
+        if key not in self.buffers:
+            self.get_buffer(stream=stream, variate='normal', draw=lambda g, size: g.standard_normal(size))
+        return loc + scale * self.buffers[key].next()
+
+    def choice(self, stream, population, size, replace):
+        """
+        random selection from the population, as numpy Generator.choice
+        :param stream: name of the stream
+        :param population: list to choose from
+        :param size: number of elements selected
+        :param replace: select with or without replacement
+        :return: list with the selected elements
+        """
+        n = len(population)
+        if size > n:
+            raise Exception("higher quantity requested than possible")
+        variate = f'integers_{n}' if replace else f'permutation_{n}'
+        key = (stream, variate)
+        if key not in self.buffers:
+            if replace:
+                # rows of independent indexes
+                draw = lambda g, block: g.integers(0, n, (block, n))
+            else:
+                # rows of random permutations, a prefix of a permutation is a selection without replacement
+                draw = lambda g, block: g.random((block, n)).argsort(axis=1)
+            self.get_buffer(stream=stream, variate=variate, draw=draw)
+        indexes = self.buffers[key].next()
+        return [population[j] for j in indexes[:size]]
@@ -1,6 +1,3 @@
-from operator import itemgetter
-
-
 class Release(object):
     def __init__(self, simulation):
         """
@@ -35,15 +32,11 @@ class Release(object):
         self.tracking_variable = self.sim.policy_panel.release_technique_attributes['tracking_variable']
         # check if release tracking variable is work centre specific
         if self.tracking_variable == 'work_centre':
-            self.sim.policy_panel.released = {}
-            self.sim.policy_panel.completed = {}
-            release_target = {}
-            # add new tracking variable for
-            for work_centre in self.sim.model_panel.WORK_CENTRES.keys():
-                self.sim.policy_panel.released[work_centre] = 0
-                self.sim.policy_panel.completed[work_centre] = 0
-                release_target[work_centre] = self.sim.policy_panel.release_target
-            self.sim.policy_panel.release_target = release_target
+            # add new tracking variable for each work centre
+            number_of_work_centres = len(self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT)
+            self.sim.policy_panel.released = [0] * number_of_work_centres
+            self.sim.policy_panel.completed = [0] * number_of_work_centres
+            self.sim.policy_panel.release_target = [self.sim.policy_panel.release_target] * number_of_work_centres
         # check if periodic release must be activated
         if 'periodic' in self.sim.policy_panel.release_technique_attributes['release_triggers']:
             self.activate_periodic_release = True
@@ -71,6 +64,12 @@ class Release(object):
         # put order in pool
         pool_item = self.pool_item(order=order)
         self.sim.model_panel.POOLS.put(pool_item)
+        if self.sim.inventory.material_availability is not None:
+            self.sim.inventory.material_availability.add_order(order=order)
+        if self.sim.policy_panel.material_allocation == 'HB':
+            self.sim.inventory.rationing_sequence_add(order=order,
+                                                      pool_key=self.sim.model_panel.POOLS.pool_keys[order.identifier])
+        self.sim.generation.pool_entry(order=order)
         # activate release mechanism
         if self.sim.policy_panel.release_technique == "DRACO":
             self.sim.system_state_dispatching.full_control_mode(trigger_mode='arrival', order=order)
@@ -92,7 +91,7 @@ class Release(object):
         if self.activate_continuous_trigger:
             if order is not None:
                 # new order arrival
-                work_centre = order.routing_sequence[0]
+                work_centre = order.next_work_centre
                 if self.control_queue_empty(work_centre=work_centre):
                     self.continuous_trigger(work_centre=work_centre)
             elif work_centre is not None:
@@ -101,7 +100,7 @@ class Release(object):
                     self.continuous_trigger(work_centre=work_centre)
             elif material_arrival and self.sim.model_panel.DELIVERY != "immediate":
                 # new material arrival
-                for potential_starving_work_centre in self.sim.model_panel.WORK_CENTRES:
+                for potential_starving_work_centre in self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT:
                     if self.control_queue_empty(work_centre=potential_starving_work_centre):
                         self.continuous_trigger(work_centre=potential_starving_work_centre)
         return
@@ -148,29 +147,51 @@ class Release(object):
         :return: void
         """
         release_now[self.index_sorting_removal] = 0
-        # sort the queue
-        self.sim.model_panel.POOLS.items.sort(key=itemgetter(self.index_sorting_removal))
-        self.sim.model_panel.POOLS.get()
+        self.sim.model_panel.POOLS.remove(identifier=release_now[self.index_order_object].identifier)
+        if self.sim.inventory.material_availability is not None:
+            self.sim.inventory.material_availability.remove_order(order=release_now[self.index_order_object])
+        if self.sim.policy_panel.material_allocation == 'HB':
+            self.sim.inventory.rationing_sequence_remove(order=release_now[self.index_order_object])
+        self.sim.generation.pool_exit(order=release_now[self.index_order_object])
         return
 
-    def get_release_list(self):
+    def get_release_list(self, work_centre=None):
         """
         find which orders have can be made as material is available, and turn the pool
+        :param work_centre: if given, only the orders with this gateway work centre are considered
         """
-        # update rationing sequence, if applicable
-        if self.sim.policy_panel.material_allocation == 'HB':
-            self.sim.inventory.rationing_sequence_update()
         # setup params
         release_list = list()
         # if there are no items in the pool, return
-        if len(self.sim.model_panel.POOLS.items) == 0:
+        if len(self.sim.model_panel.POOLS) == 0:
             return None, True
+        # event-driven availability, the ready orders are known
+        if self.sim.inventory.material_availability is not None:
+            release_list = self.sim.model_panel.POOLS.subset_items(
+                identifiers=self.sim.inventory.material_availability.ready,
+                work_centre=work_centre)
+            for pool_item in release_list:
+                order = pool_item[self.index_order_object]
+                if not order.material_available:
+                    order.material_available_time = self.sim.env.now
+            if len(release_list) == 0:
+                return None, True
+            return release_list, False
+        # orders that need a material which is out of stock cannot be released
+        blocked_orders = set()
+        for material in self.sim.model_panel.materials:
+            if not self.sim.inventory.inventory_availability_check(material=material, amount=1, fill_rate_check=False):
+                blocked_orders.update(self.sim.model_panel.POOLS.material_orders(material=material))
+        # get the candidate items, sorted on pool priority
+        if work_centre is None:
+            pool_list = self.sim.model_panel.POOLS.items
+        else:
+            pool_list = self.sim.model_panel.POOLS.gateway_items(work_centre=work_centre)
         # get the items that for which there are materials available
-        pool_list = self.sim.model_panel.POOLS.items
         for pool_item in pool_list:
             order = pool_item[self.index_order_object]
-            # update priorities
-            self.set_pool_priority(order=order)
+            if order.identifier in blocked_orders:
+                continue
             # check materials
             material_check = self.sim.inventory.material_check(order=order)
             if material_check:
@@ -192,14 +213,15 @@ class Release(object):
         order.materials.extend(material_list)
         return
 
-    def control_measure(self, order, work_centre=None):
+    def control_measure(self, order, work_centre=None, position=None):
         """
         function that contributes the correct load measure
+        :param position: position of the operation at the work centre in the routing, used by the workload measure
         """
         if self.measure == "WIP":
             return 1
         elif self.measure == "direct_load" and work_centre is None:
-            return sum(order.process_time_release.values())
+            return sum(order.process_time_release)
         elif self.measure == "direct_load" and work_centre is not None:
             return order.process_time_release[work_centre]
         elif self.measure == "expected_load" and work_centre is None:
@@ -207,7 +229,7 @@ class Release(object):
         elif self.measure == "expected_load" and work_centre is not None:
             return self.sim.model_panel.MEAN_PROCESS_TIME
         elif self.measure == "workload" and work_centre is not None:
-            return order.process_time_release[work_centre] / (order.routing_sequence_data.index(work_centre) + 1)
+            return order.process_time_release[work_centre] / (position + 1)
         else:
             raise Exception('failed review the correct tracking measure for release')
 
@@ -229,9 +251,10 @@ class Release(object):
         elif self.tracking_variable == 'work_centre':
             released = self.sim.policy_panel.released.copy()
             completed = self.sim.policy_panel.completed.copy()
-            for work_centre in order.routing_sequence:
+            for position in range(order.routing_position, len(order.routing_sequence_data)):
+                work_centre = order.routing_sequence_data[position]
                 # contribute
-                released[work_centre] += self.control_measure(order=order, work_centre=work_centre)
+                released[work_centre] += self.control_measure(order=order, work_centre=work_centre, position=position)
                 # compare against target
                 if released[work_centre] - completed[work_centre] > \
                         self.sim.policy_panel.release_target[work_centre]:
@@ -247,7 +270,7 @@ class Release(object):
         return release
 
     def starvation_release_review(self, order, work_centre):
-        if order.routing_sequence[0] == work_centre:
+        if order.next_work_centre == work_centre:
             return True
         else:
             return False
@@ -260,14 +283,18 @@ class Release(object):
             # contribute
             self.sim.policy_panel.released += self.control_measure(order=order)
         elif self.tracking_variable == 'work_centre':
-            for work_centre in order.routing_sequence:
+            for position in range(order.routing_position, len(order.routing_sequence_data)):
+                work_centre = order.routing_sequence_data[position]
                 # contribute following aggregate load method Oosterman et al., 2000
                 self.sim.policy_panel.released[work_centre] += self.control_measure(order=order,
-                                                                                    work_centre=work_centre)
+                                                                                    work_centre=work_centre,
+                                                                                    position=position)
         elif self.tracking_variable in ['none', 'planned_release_time']:
             self.sim.policy_panel.released += 1
         else:
             raise Exception('failed review the correct tracking variable for release')
+        if self.sim.data.state_recorder is not None:
+            self.sim.data.state_recorder.update()
         return
 
     def contribute_completed(self, order, work_centre=None):
@@ -277,22 +304,27 @@ class Release(object):
         if self.tracking_variable in ['total', 'remaining_total']:
             # contribute
             self.sim.policy_panel.completed += self.control_measure(order=order,
-                                                                    work_centre=work_centre)
+                                                                    work_centre=work_centre,
+                                                                    position=order.routing_position - 1)
         elif self.tracking_variable in ['work_centre']:
             # contribute following aggregate load method Oosterman et al., 2000
             self.sim.policy_panel.completed[work_centre] += self.control_measure(order=order,
-                                                                                 work_centre=work_centre)
+                                                                                 work_centre=work_centre,
+                                                                                 position=order.routing_position - 1)
         elif self.tracking_variable in ['none', 'planned_release_time']:
             self.sim.policy_panel.completed += 1
         else:
             raise Exception('failed review the correct tracking variable for release')
+        if self.sim.data.state_recorder is not None:
+            self.sim.data.state_recorder.update()
         return
 
     def release(self, review_condition="target", attr=None, put_in_queue=True):
-        # sequence the orders currently in the pool
-        self.sim.model_panel.POOLS.items.sort(key=itemgetter(self.index_priority))
-        # get valid pool items
-        pool_list, break_loop = self.get_release_list()
+        # get valid pool items, the pool is kept in sequence
+        if review_condition == 'starvation':
+            pool_list, break_loop = self.get_release_list(work_centre=attr['work_centre'])
+        else:
+            pool_list, break_loop = self.get_release_list()
         # indicate release
         next_release = False
         # orders in pool
@@ -404,7 +436,7 @@ class Release(object):
         :param: work_center:
         :return: bool
         """
-        in_system = len(self.sim.model_panel.QUEUES[work_centre].items) + \
+        in_system = len(self.sim.model_panel.QUEUES[work_centre]) + \
                     len(self.sim.model_panel.WORK_CENTRES[work_centre].users)
         if in_system == 0:
             return True
@@ -413,7 +445,7 @@ class Release(object):
 
     def collect_starving_work_centres_work_centres(self):
         starving_work_centres = []
-        for work_centre in self.sim.model_panel.WORK_CENTRES:
+        for work_centre in self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT:
             if self.control_queue_empty(work_centre=work_centre):
                 starving_work_centres.append(work_centre)
         return starving_work_centres
@@ -443,7 +475,7 @@ class Release(object):
         for item_type, material in self.sim.model_panel.materials.items():
             material_needs[item_type] = 0
         # no material needs
-        if len(self.sim.model_panel.POOLS.items) == 0:
+        if len(self.sim.model_panel.POOLS) == 0:
             return material_needs
         # determine the material needs
         pool_list = self.sim.model_panel.POOLS.items
@@ -0,0 +1,62 @@
+import os
+
+# pyarrow is only required for the parquet result writer, an optional dependency (requirements-optional.txt)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class ParquetResultWriter(object):
+    def __init__(self, file, compression='zstd'):
+        """
+        streaming writer that appends the data of each run as a row group to a parquet file
+        :param file: path of the parquet file
+        :param compression: parquet compression codec
+        """
+        if pq is None:
+            raise Exception("the parquet result writer requires pyarrow")
+        self.file = file
+        self.compression = compression
+        self.writer = None
+        self.rows = 0
+        return
+
+    def write(self, database):
+        """
+        write a chunk of the database as a new row group
+        :param database: DataFrame of a run
+        :return: void
+        """
+        table = pa.Table.from_pandas(database, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.file, table.schema, compression=self.compression)
+        self.writer.write_table(table)
+        self.rows += table.num_rows
+        return
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        return
+
+
+def result_file(path, experiment_name):
+    return os.path.join(path, experiment_name + ".parquet")
+
+
+def load_experiment(file, columns=None):
+    """
+    read an experiment back lazily, one run (row group) at a time
+    :param file: path of the parquet file
+    :param columns: list of columns to read, None reads all columns
+    :return: generator of DataFrames
+    """
+    if pq is None:
+        raise Exception("loading parquet results requires pyarrow")
+    parquet_file = pq.ParquetFile(file)
+    for row_group in range(parquet_file.num_row_groups):
+        yield parquet_file.read_row_group(row_group, columns=columns).to_pandas()
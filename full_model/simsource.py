@@ -9,7 +9,7 @@ class Demand(object):
         """
         self.sim = simulation
         self.random_generator = Random()
-        self.random_generator.seed(999999)
+        self.random_generator.seed(self.sim.random_seeds['demand'])
         """
         note, these generators are NOT independent
         """
@@ -36,7 +36,11 @@ class Demand(object):
             # release control
             self.sim.release.put_in_pool(order=order)
             # next inter arrival time
-            inter_arrival_time = self.random_generator.expovariate(1 / self.mean_time_between_arrivals)
+            if self.sim.random_streams is not None:
+                inter_arrival_time = self.sim.random_streams.exponential(stream='demand',
+                                                                         mean=self.mean_time_between_arrivals)
+            else:
+                inter_arrival_time = self.random_generator.expovariate(1 / self.mean_time_between_arrivals)
             yield self.sim.env.timeout(inter_arrival_time)
             i += 1
             if self.sim.env.now >= (self.sim.model_panel.WARM_UP_PERIOD + self.sim.model_panel.RUN_TIME) \
@@ -1,6 +1,9 @@
 from simpy import Environment, Event
 from random import Random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
 import numpy as np
+import pandas as pd
 from scipy import stats
 import socket
 import warnings
@@ -18,6 +21,13 @@ from release import Release
 from inventory import Inventory
 from supply import Supply
 from systemstatedispatching import SystemStateDispatching
+from randomstreams import RandomStreams
+from profiler import Profiler
+
+# python random number streams, each seeded separately
+RANDOM_STREAMS = ['orders', 'shop', 'demand', 'process', 'generation', 'supply']
+# numpy random number streams, spawned from the seed sequence
+NP_RANDOM_STREAMS = ['inventory', 'supply', 'disruption']
 
 
 class SimulationModel(object):
@@ -26,10 +36,20 @@ class SimulationModel(object):
     the simulation instance (i.e. self) is passed in the other function outside this class as sim
     """
 
-    def __init__(self, exp_number: int = 1, print_info=True) -> None:
+    def __init__(self, exp_number: int = 1, print_info=True, seed_sequence=None, number_of_runs=None,
+                 model_settings=None) -> None:
+        """
+        :param exp_number: experiment number
+        :param print_info: print run information
+        :param seed_sequence: numpy SeedSequence of an independent replication block, None uses the fixed seeds
+        :param number_of_runs: number of runs of an independent replication block, None uses the model panel
+        :param model_settings: dictionary with settings of the model panel that replace the defaults, e.g. the run
+        length of a benchmark
+        """
         # setup general params
         self.exp_number: int = exp_number
         self.warm_up: bool = True
+        self.replication_block: bool = number_of_runs is not None
 
         # Set seed for specifically process times and other random generators
         """
@@ -37,19 +57,29 @@ class SimulationModel(object):
         - from the module Random(), this is used for orders, and the shop floor
         - from the module Numpy, this is for the inventory process
         - from the module 
+        independent replication blocks derive all seeds from their own seed sequence
         """
+        if seed_sequence is None:
+            self.seed_sequence = np.random.SeedSequence(12345)
+            self.random_seeds = {stream: 999999 for stream in RANDOM_STREAMS}
+        else:
+            self.seed_sequence = seed_sequence
+            seeds = self.seed_sequence.generate_state(len(RANDOM_STREAMS))
+            self.random_seeds = {stream: int(seeds[s]) for s, stream in enumerate(RANDOM_STREAMS)}
+
         # order random number stream
         self.random_generator: Random = Random()
-        self.random_generator.seed(999999)
+        self.random_generator.seed(self.random_seeds['orders'])
 
         # numpy common random number streams
         self.NP_random_generator = {}
-        streams_for = ['inventory', 'supply', 'disruption']
-        self.seed_sequence = np.random.SeedSequence(12345)
-        self.child_seeds = self.seed_sequence.spawn(len(streams_for))
+        self.child_seeds = self.seed_sequence.spawn(len(NP_RANDOM_STREAMS))
         streams = [np.random.default_rng(s) for s in self.child_seeds]
         for s, stream in enumerate(streams):
-            self.NP_random_generator[streams_for[s]] = stream
+            self.NP_random_generator[NP_RANDOM_STREAMS[s]] = stream
+
+        # buffered numpy random number streams, set when the model panel is known
+        self.random_streams = None
 
         # import the Simpy environment
         self.env: Environment = Environment()
@@ -59,8 +89,13 @@ class SimulationModel(object):
             simulation=self)
 
         # get the model and policy control panel
+        self.model_settings = model_settings
         self.model_panel: ModelPanel = ModelPanel(
-            experiment_number=self.exp_number, simulation=self)
+            experiment_number=self.exp_number, simulation=self, model_settings=model_settings)
+        if self.replication_block:
+            self.model_panel.NUMBER_OF_RUNS = number_of_runs
+        if self.model_panel.RANDOM_VARIATES == 'buffered':
+            self.random_streams = RandomStreams(simulation=self)
         self.policy_panel: PolicyPanel = PolicyPanel(
             experiment_number=self.exp_number, simulation=self)
         self.print_info: bool = print_info
@@ -88,6 +123,12 @@ class SimulationModel(object):
         # activate data collection methods
         self.run_manager = self.env.process(SimulationModel.run_manager(self))
 
+        # instrument the subsystems, if required
+        self.profiler = None
+        if self.model_panel.PROFILING:
+            self.profiler = Profiler(simulation=self)
+            self.profiler.instrument()
+
     def sim_function(self) -> None:
         """
         initialling and timing of the generator functions
@@ -96,19 +137,246 @@ class SimulationModel(object):
         # set the the length of the simulation (add one extra time unit to save result last run)
         if self.print_info:
             self.print_start_info()
+        # run the replications as independent models, if required
+        if self.model_panel.REPLICATION_MODE == 'independent' and not self.replication_block:
+            self.sim_function_independent()
+            if self.print_info:
+                self.print_end_info()
+            return
+        if self.profiler is not None:
+            self.profiler.start()
         # start the generators
-        self.generation.initialize_generation()
-
-        self.demand_process = self.env.process(self.demand.generate_random_arrival_exp())
+        self.start_processes()
 
         # start simulation
         sim_time = (self.model_panel.WARM_UP_PERIOD +
                     self.model_panel.RUN_TIME) * self.model_panel.NUMBER_OF_RUNS + 0.001
-        self.env.run(until=sim_time)
+        if self.model_panel.STOPPING_RULE == 'sequential':
+            # the run manager ends the simulation once the stopping rule is satisfied
+            self.env.run(until=self.run_manager)
+        else:
+            self.env.run(until=sim_time)
+        # finish the result file, if the data is streamed
+        if self.data.result_writer is not None:
+            self.data.result_writer.close()
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler.save_report(file=os.path.join(self.get_directory(),
+                                                        "profile_" + self.model_panel.experiment_name + ".csv"))
         # simulation finished, print final info
         if self.print_info:
             self.print_end_info()
 
+    def start_processes(self) -> None:
+        self.generation.initialize_generation()
+        self.demand_process = self.env.process(self.demand.generate_random_arrival_exp())
+        return
+
+    def reseed(self, seed_sequence) -> None:
+        """
+        replace the state of all random number streams in place with the streams of a new seed sequence, as a new model
+        with this seed sequence would use. Used to continue a warmed-up model as an independent replication block.
+        :param seed_sequence: numpy SeedSequence
+        :return: void
+        """
+        self.seed_sequence = seed_sequence
+        seeds = self.seed_sequence.generate_state(len(RANDOM_STREAMS))
+        self.random_seeds = {stream: int(seeds[s]) for s, stream in enumerate(RANDOM_STREAMS)}
+        # python random number streams
+        owners = {'orders': self, 'shop': self.general_functions, 'demand': self.demand, 'process': self.process,
+                  'generation': self.generation, 'supply': self.supplier}
+        for stream, owner in owners.items():
+            owner.random_generator.seed(self.random_seeds[stream])
+        # numpy random number streams
+        self.child_seeds = self.seed_sequence.spawn(len(NP_RANDOM_STREAMS))
+        for s, stream in enumerate(NP_RANDOM_STREAMS):
+            self.NP_random_generator[stream].bit_generator.state = \
+                np.random.default_rng(self.child_seeds[s]).bit_generator.state
+        if self.random_streams is not None:
+            self.random_streams.reseed()
+        return
+
+    def sim_function_independent(self) -> None:
+        """
+        run the replications as independent simulation models on a process pool. Each block of replications has its
+        own warm-up and a seed sequence spawned from the seed sequence of the experiment. The results of the blocks
+        are merged into the experiment database in run order.
+        :return: void
+        """
+        # split the replications into blocks
+        runs_per_block = self.model_panel.RUNS_PER_BLOCK
+        blocks = []
+        for first_run in range(1, self.model_panel.NUMBER_OF_RUNS + 1, runs_per_block):
+            number_of_runs = min(runs_per_block, self.model_panel.NUMBER_OF_RUNS - first_run + 1)
+            blocks.append((first_run, number_of_runs))
+        block_seeds = self.seed_sequence.spawn(len(blocks))
+
+        # run the blocks
+        results = {}
+        stop_run = None
+        if self.model_panel.WARM_START:
+            completed_blocks = self.warm_started_replication_blocks(blocks=blocks, block_seeds=block_seeds)
+        else:
+            completed_blocks = self.replication_blocks(blocks=blocks, block_seeds=block_seeds)
+        for first_run, result in completed_blocks:
+            results[first_run] = result
+            if self.print_info:
+                print(f'replication block starting at run {first_run} completed')
+            if self.model_panel.STOPPING_RULE == 'sequential':
+                stop_run = self.independent_stopping_rule(results=results)
+                if stop_run is not None:
+                    # cancel the blocks that did not start yet
+                    completed_blocks.close()
+                    break
+
+        # merge the results in run order, up to the run the stopping rule was satisfied
+        databases = []
+        for first_run in sorted(results.keys()):
+            if stop_run is not None and first_run > stop_run:
+                break
+            database, order_input_counter, order_output_counter = results[first_run]
+            if database is not None:
+                databases.append(database)
+            self.data.order_input_counter += order_input_counter
+            self.data.order_output_counter += order_output_counter
+        if len(databases) > 0:
+            self.data.experiment_database = pd.concat(databases, ignore_index=True)
+        return
+
+    def replication_blocks(self, blocks, block_seeds):
+        """
+        run each replication block from an empty shop on a process pool
+        :param blocks: list with the first run and number of runs of each block
+        :param block_seeds: seed sequence of each block
+        :return: generator of the first run and results of the completed blocks
+        """
+        with ProcessPoolExecutor(max_workers=self.model_panel.REPLICATION_WORKERS) as executor:
+            futures = {}
+            for b, (first_run, number_of_runs) in enumerate(blocks):
+                future = executor.submit(run_replication_block,
+                                         exp_number=self.exp_number,
+                                         first_run=first_run,
+                                         number_of_runs=number_of_runs,
+                                         seed_sequence=block_seeds[b],
+                                         model_settings=self.model_settings)
+                futures[future] = first_run
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def warm_started_replication_blocks(self, blocks, block_seeds):
+        """
+        run the warm-up once and fork the warmed-up model for each replication block. The forked model holds the
+        complete state of the shop, including the pending SimPy processes, and continues with the random streams of
+        its block. The blocks are dependent through the shared warm-up state.
+        :param blocks: list with the first run and number of runs of each block
+        :param block_seeds: seed sequence of each block
+        :return: generator of the first run and results of the completed blocks
+        """
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise Exception("warm-started replications require os.fork")
+        context = multiprocessing.get_context('fork')
+        workers = self.model_panel.REPLICATION_WORKERS or os.cpu_count()
+
+        # warm up a single model
+        warm_model = SimulationModel(exp_number=self.exp_number,
+                                     print_info=False,
+                                     seed_sequence=self.seed_sequence.spawn(1)[0],
+                                     number_of_runs=blocks[0][1],
+                                     model_settings=self.model_settings)
+        warm_model.warm_up_model()
+        # the orders of the warm-up are counted once, not for each block
+        self.data.order_input_counter += warm_model.data.order_input_counter
+        self.data.order_output_counter += warm_model.data.order_output_counter
+
+        # fork the warmed-up model for each block, with at most workers blocks at the same time
+        queue = context.Queue()
+        waiting = [(first_run, number_of_runs, block_seeds[b]) for b, (first_run, number_of_runs) in enumerate(blocks)]
+        running = {}
+        try:
+            while len(waiting) > 0 or len(running) > 0:
+                while len(waiting) > 0 and len(running) < workers:
+                    first_run, number_of_runs, seed_sequence = waiting.pop(0)
+                    process = context.Process(target=run_warm_started_block,
+                                              args=(warm_model, first_run, number_of_runs, seed_sequence, queue))
+                    process.start()
+                    running[first_run] = process
+                first_run, result = queue.get()
+                running.pop(first_run).join()
+                if isinstance(result, Exception):
+                    raise result
+                yield first_run, result
+        finally:
+            for process in running.values():
+                process.terminate()
+                process.join()
+
+    def warm_up_model(self) -> None:
+        """
+        simulate the first warm-up period, the run manager ends the warm-up at the first event of the continued model
+        :return: void
+        """
+        self.start_processes()
+        self.env.run(until=self.model_panel.WARM_UP_PERIOD)
+        return
+
+    def continue_replication_block(self, number_of_runs, seed_sequence) -> None:
+        """
+        continue a warmed-up model as a replication block
+        :param number_of_runs: number of replications in the block
+        :param seed_sequence: seed sequence of the block
+        :return: void
+        """
+        self.reseed(seed_sequence=seed_sequence)
+        self.model_panel.NUMBER_OF_RUNS = number_of_runs
+        self.data.order_input_counter = 0
+        self.data.order_output_counter = 0
+        sim_time = (self.model_panel.WARM_UP_PERIOD +
+                    self.model_panel.RUN_TIME) * self.model_panel.NUMBER_OF_RUNS + 0.001
+        self.env.run(until=sim_time)
+        return
+
+    def independent_stopping_rule(self, results):
+        """
+        evaluate the stopping rule on the completed replication blocks that directly follow each other from run 1
+        :param results: completed replication blocks, with the first run as key
+        :return: last run of the blocks if the stopping rule is satisfied, otherwise None
+        """
+        databases = []
+        next_run = 1
+        while next_run in results.keys():
+            database, _, _ = results[next_run]
+            if database is None:
+                return None
+            databases.append(database)
+            next_run += database.shape[0]
+        if len(databases) == 0:
+            return None
+        self.data.experiment_database = pd.concat(databases, ignore_index=True)
+        if self.stopping_rule(run_number=next_run - 1):
+            return next_run - 1
+        return None
+
+    def stopping_rule(self, run_number) -> bool:
+        """
+        sequential stopping rule, the replications stop once the relative half-width of the confidence interval of all
+        stopping criteria is below the required precision
+        :param run_number: number of completed runs
+        :return: True if the replications can stop
+        """
+        if self.model_panel.STOPPING_RULE != 'sequential' or self.replication_block:
+            return False
+        if run_number < max(self.model_panel.MIN_RUNS, 2):
+            return False
+        for criteria in self.model_panel.STOPPING_CRITERIA:
+            deviation = float(self.replication_confidence_interval(run_number=run_number, criteria=criteria)[-1])
+            # an undefined deviation (nan) does not satisfy the stopping rule
+            if not abs(deviation) <= self.model_panel.STOPPING_PRECISION * 100:
+                return False
+        return True
+
     def run_manager(self) -> Generator[Event, None, None]:
         """
         The run manager managing processes during the simulation. Can perform the same actions in through cyclic
@@ -123,7 +391,7 @@ class SimulationModel(object):
             # update data
             self.data.run_update(warmup=self.warm_up)
             if self.model_panel.data_collection == 'periodic':
-                self.env.process(self.data.periodic_data_collection())
+                self.data.start_periodic_data_collection()
             yield self.env.timeout(self.model_panel.RUN_TIME)
             # chance the warm_up status
             self.warm_up = False
@@ -132,6 +400,12 @@ class SimulationModel(object):
             # print run info if required
             if self.print_info:
                 self.print_run_info()
+            # stop the replications if the confidence intervals are tight enough
+            run_number = int(round(self.env.now / (self.model_panel.WARM_UP_PERIOD + self.model_panel.RUN_TIME)))
+            if self.stopping_rule(run_number=run_number):
+                if self.print_info:
+                    print(f'stopping rule satisfied after {run_number} runs')
+                return
         return
 
     def print_run_info(self):
@@ -183,6 +457,12 @@ class SimulationModel(object):
         save all the experiment data versions
         :return: void
         """
+        # the data is already streamed to file
+        if self.data.result_writer is not None:
+            self.data.result_writer.close()
+            print(f"simulation data streamed to:    {self.data.result_writer.file}")
+            return
+
         # initialize params
         df = self.data.experiment_database
         file_version = ".csv"
@@ -232,6 +512,8 @@ class SimulationModel(object):
                 f"\tinput this experiment:      {self.data.order_input_counter}")
             print(
                 f"\toutput this experiment:     {self.data.order_output_counter}")
+            print(
+                f"\tdatabase memory:            {round(self.data.database_memory() / 1e6, 3)} MB")
 
     @staticmethod
     def save_database_csv(file, database):
@@ -273,6 +555,55 @@ class SimulationModel(object):
         return print('Warm-up period finished')
 
 
+def run_replication_block(exp_number, first_run, number_of_runs, seed_sequence, model_settings=None):
+    """
+    run a block of independent replications, executed in a worker process
+    :param exp_number: experiment number
+    :param first_run: run number of the first replication in the block
+    :param number_of_runs: number of replications in the block
+    :param seed_sequence: seed sequence of the block
+    :param model_settings: settings of the model panel of the experiment
+    :return: experiment database of the block, order input counter, order output counter
+    """
+    sim = SimulationModel(exp_number=exp_number,
+                          print_info=False,
+                          seed_sequence=seed_sequence,
+                          number_of_runs=number_of_runs,
+                          model_settings=model_settings)
+    sim.sim_function()
+    return replication_block_results(sim=sim, first_run=first_run)
+
+
+def run_warm_started_block(warm_model, first_run, number_of_runs, seed_sequence, queue):
+    """
+    continue the warmed-up model as a block of replications, executed in a forked process
+    :param warm_model: warmed-up simulation object, inherited from the parent process
+    :param first_run: run number of the first replication in the block
+    :param number_of_runs: number of replications in the block
+    :param seed_sequence: seed sequence of the block
+    :param queue: queue receiving the first run and results of the block
+    :return: void
+    """
+    try:
+        warm_model.continue_replication_block(number_of_runs=number_of_runs, seed_sequence=seed_sequence)
+        result = replication_block_results(sim=warm_model, first_run=first_run)
+    except Exception as error:
+        result = Exception(f"replication block starting at run {first_run} failed: {error!r}")
+    queue.put((first_run, result))
+    return
+
+
+def replication_block_results(sim, first_run):
+    """
+    :return: experiment database of the block, order input counter, order output counter
+    """
+    database = sim.data.experiment_database
+    # number the runs within the experiment
+    if database is not None and 'run' in database.columns:
+        database['run'] = database['run'] + first_run - 1
+    return database, sim.data.order_input_counter, sim.data.order_output_counter
+
+
 if __name__ == "__main__":
     # import simulation model
     sim = SimulationModel()
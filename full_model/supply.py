@@ -8,7 +8,7 @@ class Supply(object):
     def __init__(self, simulation):
         self.sim = simulation
         self.random_generator: Random = Random()
-        self.random_generator.seed(999999)
+        self.random_generator.seed(self.sim.random_seeds['supply'])
         self.mean_replenishment_time = self.sim.model_panel.expected_replenishment_time
 
         """
@@ -64,6 +64,27 @@ class Supply(object):
                 disruption_index = (self.sim.model_panel.disruption_severity / self.sim.model_panel.disruption_duration)
                 return 1 + (disruption_index * (self.sim.model_panel.disruption_duration - time_evolved))
 
+    def buffered_shipping_time(self, mean_replenishment_time):
+        """
+        stochastic shipping time from the buffered supply stream
+        :param mean_replenishment_time: expected shipping time
+        :return: shipping time
+        """
+        if self.sim.model_panel.SUPPLY_DISTRIBUTION == 'exponential':
+            return self.sim.random_streams.exponential(stream='supply', mean=mean_replenishment_time)
+        elif self.sim.model_panel.SUPPLY_DISTRIBUTION == 'k_erlang':
+            return self.sim.random_streams.erlang(stream='supply',
+                                                  mean=mean_replenishment_time,
+                                                  k=self.sim.model_panel.supply_k)
+        elif self.sim.model_panel.SUPPLY_DISTRIBUTION == 'normal':
+            shipping_time = -np.inf
+            while shipping_time < 0:
+                shipping_time = self.sim.random_streams.normal(stream='supply',
+                                                               loc=mean_replenishment_time,
+                                                               scale=self.sim.model_panel.supply_sigma)
+            return shipping_time
+        raise Exception(f'unknown replenishment time distribution')
+
     def parallel_delivery(self, item_type):
         # determine the expected time
         if not self.sim.model_panel.DISRUPTION:
@@ -74,6 +95,8 @@ class Supply(object):
         # get stochastic value
         if self.sim.model_panel.SUPPLY_DISTRIBUTION == 'constant':
             shipping_time = mean_replenishment_time
+        elif self.sim.random_streams is not None:
+            shipping_time = self.buffered_shipping_time(mean_replenishment_time=mean_replenishment_time)
         elif self.sim.model_panel.SUPPLY_DISTRIBUTION == 'exponential':
             shipping_time = self.sim.NP_random_generator['supply'].exponential(mean_replenishment_time)
         elif self.sim.model_panel.SUPPLY_DISTRIBUTION == 'k_erlang':
@@ -110,7 +133,10 @@ class Supply(object):
         if self.sim.model_panel.SUPPLY_DISTRIBUTION == 'constant':
             shipping_time = mean_replenishment_time
         elif self.sim.model_panel.SUPPLY_DISTRIBUTION == 'exponential':
-            shipping_time = self.sim.NP_random_generator['supply'].exponential(mean_replenishment_time)
+            if self.sim.random_streams is not None:
+                shipping_time = self.sim.random_streams.exponential(stream='supply', mean=mean_replenishment_time)
+            else:
+                shipping_time = self.sim.NP_random_generator['supply'].exponential(mean_replenishment_time)
         else:
             raise Exception(f'unknown replenishment time distribution')
         # get material expected_lead_time
@@ -1,4 +1,5 @@
 import math
+from heapq import heappush, heappop, heapify
 from operator import itemgetter
 import numpy as np
 
@@ -16,6 +17,12 @@ class SystemStateDispatching(object):
         """ system-state variables """
         self.last_update_system_state_variables = -1
         self.order_book = {}
+        # order book statistics, updated when an order enters, changes state or leaves the order book
+        self.order_book_statistics = {}
+        self.order_book_contributions = {}
+        self.order_book_WIP = 0
+        self.track_FOCUS = self.sim.policy_panel.ssd_rule == "FOCUS" or \
+                           self.sim.policy_panel.dispatching_rule == "FOCUS"
 
         # release
         self.activate_release_WIP_target = True
@@ -28,10 +35,7 @@ class SystemStateDispatching(object):
         self.total_workload = 0
 
         # dispatching
-        self.T_list = list()
         self.A_dict = dict()
-        self.S_list = list()
-        self.V_list = list()
 
         # IPD
         self.IPD_pool_max = np.inf
@@ -83,29 +87,26 @@ class SystemStateDispatching(object):
         # depending on the triggering mode, the work centre needs to be found
         if trigger_mode == 'arrival':
             # control if the queue is not empty
-            if not self.sim.release.control_queue_empty(work_centre=order.routing_sequence[0]):
+            if not self.sim.release.control_queue_empty(work_centre=order.next_work_centre):
                 # work centre not starting; return
                 return None, True
             else:
                 # work centre is idling, needs a new order
-                # update the material allocation policy, if necessary
-                if self.sim.policy_panel.material_allocation == 'HB':
-                    self.sim.inventory.rationing_sequence_update()
                 # do the material check
                 if self.sim.inventory.material_check(order=order):
                     # material available, allow for release.
-                    work_centre = order.routing_sequence[0]
+                    work_centre = order.next_work_centre
                 else:
                     # work centre starving, but materials are not there
                     return None, True
         elif trigger_mode == 'supply':
             # check if there are orders in pool
-            if len(self.sim.model_panel.POOLS.items) == 0:
+            if len(self.sim.model_panel.POOLS) == 0:
                 # no orders to dedicate the materials to
                 return None, True
             # orders available, check if a work centre is idling.
             idle_work_centre = []
-            for potential_starving_work_centre in self.sim.model_panel.WORK_CENTRES:
+            for potential_starving_work_centre in self.sim.model_panel.MANUFACTURING_FLOOR_LAYOUT:
                 if self.sim.release.control_queue_empty(work_centre=potential_starving_work_centre):
                     idle_work_centre.append(potential_starving_work_centre)
             # check for starvation
@@ -114,14 +115,13 @@ class SystemStateDispatching(object):
                 return None, True
             # check if orders in the pool move to a idling work centre, i.e. a starving one
             starving_work_centre_with_orders = []
+            material_orders = self.sim.model_panel.POOLS.material_orders(material=material)  # check material
             for starving_wc in idle_work_centre:
-                for order_list in self.sim.model_panel.POOLS.items:
-                    order = order_list[self.index_order_object]
-                    wc_check = order.routing_sequence[0] == starving_wc  # check gateway
-                    material_check = material in order.requirements  # check material
-                    if wc_check and material_check:
+                for order_list in self.sim.model_panel.POOLS.gateway_items(work_centre=starving_wc):  # check gateway
+                    if order_list[self.index_order_object].identifier in material_orders:
                         # release is possible
                         starving_work_centre_with_orders.append(starving_wc)
+                        break
             # check if release is possible
             if len(starving_work_centre_with_orders) == 0:
                 # no starving work centres; no need to release
@@ -138,13 +138,9 @@ class SystemStateDispatching(object):
 
         # get the orders in the queue and pool
         queue_list = self.sim.model_panel.QUEUES[work_centre].items.copy()
-        # get the pool of orders with materials available
-        entire_pool_list, pool_empty = self.sim.release.get_release_list()
-        # check orders in pool
-        if not pool_empty:
-            # find the orders in the pool that start at work centre
-            pool_list = self.get_workcentre_specific_release_list(pool_list=entire_pool_list, work_centre=work_centre)
-        else:
+        # get the orders in the pool that start at work centre with materials available
+        pool_list, pool_empty = self.sim.release.get_release_list(work_centre=work_centre)
+        if pool_empty:
             # no orders in the pool
             pool_list = []
 
@@ -190,6 +186,7 @@ class SystemStateDispatching(object):
             order_selected.first_entry = False
             order_selected.release = True
             order_selected.location = "system"
+            self.update_order_book(order=order_selected)
             # put the order in the queue
             queue_item = self.sim.process.queue_item(order=order_selected, work_centre=work_centre)
             self.sim.model_panel.QUEUES[work_centre].put(queue_item)
@@ -277,7 +274,6 @@ class SystemStateDispatching(object):
         """
         # params
         process_time = order.process_time[work_centre]
-        routing_list = order.routing_sequence.copy()
         slack = self.slack(
             d_i=order.due_date,
             t=self.sim.env.now,
@@ -287,7 +283,7 @@ class SystemStateDispatching(object):
         slack_opn = self.slack(
             d_i=order.due_date,
             t=self.sim.env.now,
-            k=len(routing_list),
+            k=order.remaining_operations,
             sum_p_ij=order.remaining_process_time
         )
 
@@ -338,7 +334,7 @@ class SystemStateDispatching(object):
         elif condition == 'queue':
             # dispatching rules
             if self.sim.policy_panel.dispatching_rule == "FCFS":
-                priority = order.queue_entry_time[order.routing_sequence[0]]
+                priority = order.queue_entry_time[order.next_work_centre]
             elif self.sim.policy_panel.dispatching_rule == "FISFO":
                 priority = self.sim.env.now - order.arrival_time
             elif self.sim.policy_panel.dispatching_rule == "FI-SHOP-FO":
@@ -357,49 +353,48 @@ class SystemStateDispatching(object):
             self.FOCUS_update_system_state_variables(work_centre=work_centre)
             return
 
-        """ set system-state variables """
-        self.S_list = list()
-        self.V_list = list()
-
         """ gather info state variables """
-        self.WIP = 0
-        for id, order in self.order_book.items():
-            # collect WIP
-            if order.release:
-                self.WIP += 1
-            # collect dispatching/pool priority
-            if self.sim.policy_panel.ssd_rule == 'IPD':
-                # self.S_list.append(self.IPD(order=order, condition='pool'))
-                if order.routing_sequence[0] == work_centre:
-                    self.S_list.append(self.IPD(order=order, condition='pool'))
-                if order.release:
-                    self.V_list.append(self.IPD(order=order, condition='queue'))
-            elif self.sim.policy_panel.ssd_rule == 'SINGLE':
-                self.S_list.append(self.IPD(order=order, condition='pool'))
+        self.WIP = self.order_book_WIP
+        pool_statistic = None
+        queue_statistic = None
+        if self.sim.policy_panel.ssd_rule == 'IPD':
+            pool_statistic = self.get_order_book_statistic(name=('pool', work_centre))
+            queue_statistic = self.get_order_book_statistic(name='queue')
+        elif self.sim.policy_panel.ssd_rule == 'SINGLE':
+            pool_statistic = self.get_order_book_statistic(name='pool')
 
         """ update all state variables """
-        if not len(self.S_list) == 0:
-            self.IPD_pool_max = max(self.S_list)
-            self.IPD_pool_min = min(self.S_list)
-        if not len(self.V_list) == 0:
-            self.IPD_dispatching_max = max(self.V_list)
-            self.IPD_dispatching_min = min(self.V_list)
+        if pool_statistic is not None and pool_statistic.count > 0:
+            self.IPD_pool_max = self.time_shift(value=pool_statistic.max(), sign=self.IPD_time_sign(condition='pool'))
+            self.IPD_pool_min = self.time_shift(value=pool_statistic.min(), sign=self.IPD_time_sign(condition='pool'))
+        if queue_statistic is not None and queue_statistic.count > 0:
+            self.IPD_dispatching_max = self.time_shift(value=queue_statistic.max(),
+                                                       sign=self.IPD_time_sign(condition='queue'))
+            self.IPD_dispatching_min = self.time_shift(value=queue_statistic.min(),
+                                                       sign=self.IPD_time_sign(condition='queue'))
         return
 
     def starvation_work_centre_choice(self, starving_work_centres, material):
         min_priority = np.inf
         min_work_centre = None
-        for order_list in self.sim.model_panel.POOLS.items:
+        # candidate orders, i.e., orders with a starving gateway that require the material
+        material_orders = self.sim.model_panel.POOLS.material_orders(material=material)
+        candidates = []
+        for work_centre in set(starving_work_centres):
+            for order_list in self.sim.model_panel.POOLS.gateway_items(work_centre=work_centre):
+                if order_list[self.index_order_object].identifier in material_orders:
+                    candidates.append(order_list)
+        # keep the pool sequence
+        candidates.sort(key=lambda order_list: self.sim.model_panel.POOLS.pool_keys[
+            order_list[self.index_order_object].identifier])
+        for order_list in candidates:
             order = order_list[self.index_order_object]
             # collect dispatching/pool priority
             if self.sim.policy_panel.ssd_rule in ['IPD', 'SINGLE']:
-                material_check = material in order.requirements
-                work_centre_check = order.routing_sequence[0] in starving_work_centres
-                if material_check and work_centre_check:
-                    priority = self.IPD(order=order, condition='pool')
-                    if priority < min_priority:
-                        min_priority = priority
-                        min_work_centre = order.routing_sequence[0]
+                priority = self.IPD(order=order, condition='pool')
+                if priority < min_priority:
+                    min_priority = priority
+                    min_work_centre = order.next_work_centre
         return min_work_centre
 
     def FOCUS_update_system_state_variables(self, work_centre):
@@ -408,63 +403,56 @@ class SystemStateDispatching(object):
             return
         self.last_update_system_state_variables = self.sim.env.now
         """ set system-state variables """
-        # dispatching
-        self.T_list = list()
         self.A_dict = dict()
-        self.S_list = list()
-        self.V_list = list()
 
         """ update all state variables """
-        self.WIP = 0
-        for id, order in self.order_book.items():
-            # control if the order is released
-            if order.release:
-                self.WIP += 1
-            # get dispatching variables
-            remaining_process_times, slack, slack_opn = self.get_dispatching_variables(order=order)
-            self.append_system_state_variables(process_times=remaining_process_times,
-                                               slack=slack,
-                                               slack_opn=slack_opn)
+        self.WIP = self.order_book_WIP
 
         """ 
         update system state params 
         """
+        t = self.sim.env.now
         # dispatching variables
-        if not len(self.T_list) == 0:
-            self.p_ij_min = min(self.T_list)
-            self.p_ij_max = max(self.T_list)
-            self.p_ij_mean = sum(self.T_list) / len(self.T_list)
-
-        if not len(self.S_list) == 0:
-            self.slack_min = min(self.S_list)
-            self.slack_max = max(self.S_list)
-            self.slack_mean = sum(self.S_list) / len(self.S_list)
-
-        if not len(self.V_list) == 0:
-            self.slack_opn_min = min(self.V_list)
-            self.slack_opn_max = max(self.V_list)
-            self.slack_opn_mean = sum(self.V_list) / len(self.V_list)
+        p_ij = self.get_order_book_statistic(name='p_ij')
+        if not p_ij.count == 0:
+            self.p_ij_min = p_ij.min()
+            self.p_ij_max = p_ij.max()
+            self.p_ij_mean = p_ij.total / p_ij.count
+
+        # slack shifts uniformly with time
+        slack = self.get_order_book_statistic(name='slack')
+        if not slack.count == 0:
+            self.slack_min = slack.min() - t
+            self.slack_max = slack.max() - t
+            self.slack_mean = slack.total / slack.count - t
+
+        # slack per operation shifts uniformly within the orders with the same number of remaining operations
+        slack_opn_list = list()
+        slack_opn_count = 0
+        slack_opn_total = 0
+        for k in range(1, len(self.work_centre_layout) + 1):
+            slack_k = self.get_order_book_statistic(name=('slack_opn', k))
+            if not slack_k.count == 0:
+                slack_opn_list.append((slack_k.min() - t) / k)
+                slack_opn_list.append((slack_k.max() - t) / k)
+                slack_opn_count += slack_k.count
+                slack_opn_total += (slack_k.total - slack_k.count * t) / k
+        if not slack_opn_count == 0:
+            self.slack_opn_min = min(slack_opn_list)
+            self.slack_opn_max = max(slack_opn_list)
+            self.slack_opn_mean = slack_opn_total / slack_opn_count
 
         # order book
-        self.number_of_orders_in_system = len(self.V_list)
+        self.number_of_orders_in_system = slack_opn_count
 
         # find if a work centre is starving
         if self.functions_activated["xi"] > 0:
             for j, WC in enumerate(self.work_centre_layout):
                 if WC != work_centre:
-                    # get the pool
-                    pool, _ = self.sim.release.get_release_list()
-                    if pool is not None:
-                        # split pool into subsets based on their gateway.
-                        pool_WC = self.get_workcentre_specific_release_list(pool_list=pool, work_centre=WC)
-                        if len(pool_WC) > 0:
-                            pool_empty = False
-                        else:
-                            pool_empty = True
-                    else:
-                        pool_empty = True
+                    # get the pool subset based on the gateway
+                    _, pool_empty = self.sim.release.get_release_list(work_centre=WC)
                     # indicate empty gateway
-                    if len(self.sim.model_panel.QUEUES[WC].items) == 0 and pool_empty:
+                    if len(self.sim.model_panel.QUEUES[WC]) == 0 and pool_empty:
                         self.A_dict[WC] = 1
                     else:
                         self.A_dict[WC] = 0
@@ -472,35 +460,12 @@ class SystemStateDispatching(object):
                     self.A_dict[WC] = 0
         return
 
-    def append_system_state_variables(self, process_times, slack, slack_opn):
-        self.T_list.extend(process_times)
-        self.S_list.append(slack)
-        self.V_list.append(slack_opn)
-        return
-
-    def get_dispatching_variables(self, order):
-        # remaining_process_times
-        remaining_process_times = self.remaining_process_times(routing_sequence=order.routing_sequence,
-                                                               process_times=order.process_time)
-        # slack
-        slack = self.slack(d_i=order.due_date,
-                           t=self.sim.env.now,
-                           k=1,
-                           sum_p_ij=order.remaining_process_time)
-        # slack opn
-        slack_opn = self.slack(d_i=order.due_date,
-                               t=self.sim.env.now,
-                               k=len(order.routing_sequence),
-                               sum_p_ij=order.remaining_process_time
-                               )
-        return remaining_process_times, slack, slack_opn
-
     @staticmethod
     def xi_idleness_impact(order, process_time, upstream_starvation_dict):
-        if len(order.routing_sequence) >= 2:
+        if order.remaining_operations >= 2:
             if upstream_starvation_dict != 0:
                 for WC, indicator in upstream_starvation_dict.items():
-                    if order.routing_sequence[1] == WC and indicator == 1:
+                    if order.routing_sequence_data[order.routing_position + 1] == WC and indicator == 1:
                         return process_time
                 return 0
             else:
@@ -508,13 +473,6 @@ class SystemStateDispatching(object):
         else:
             return 0
 
-    @staticmethod
-    def remaining_process_times(routing_sequence, process_times):
-        remaining_process_times = []
-        for k, operation in enumerate(routing_sequence):
-            remaining_process_times.append(process_times[operation])
-        return remaining_process_times
-
     @staticmethod
     def slack(d_i, t, k, sum_p_ij):
         return (d_i - t - sum_p_ij) / k
@@ -526,28 +484,161 @@ class SystemStateDispatching(object):
             result = (x_max - x) / (x_max - x_min)
         return result
 
-    def get_workcentre_specific_release_list(self, pool_list, work_centre):
-        return_list = []
-        for order_list in pool_list:
-            if order_list[self.index_order_object].routing_sequence[0] == work_centre:
-                return_list.append(order_list)
-        return return_list
-
     def input_order_book(self, order):
         self.order_book[order.identifier] = order
+        self.update_order_book(order=order)
         return
 
     def output_order_book(self, order):
+        self.withdraw_order_book(order=order)
         del self.order_book[order.identifier]
         return
 
-    def get_wip(self):
-        wip = 0
-        for _, order in self.order_book.items():
-            # control if the order is released
+    def update_order_book(self, order):
+        """
+        update the order book statistics after the state of an order changed, i.e., release or a new operation
+        """
+        self.withdraw_order_book(order=order)
+        released = order.release
+        contributions = self.get_order_book_contributions(order=order)
+        for name, value in contributions:
+            self.get_order_book_statistic(name=name).add(value=value)
+        if released:
+            self.order_book_WIP += 1
+            if self.sim.data.state_recorder is not None:
+                self.sim.data.state_recorder.update()
+        self.order_book_contributions[order.identifier] = (released, contributions)
+        return
+
+    def withdraw_order_book(self, order):
+        if order.identifier not in self.order_book_contributions:
+            return
+        released, contributions = self.order_book_contributions.pop(order.identifier)
+        for name, value in contributions:
+            self.order_book_statistics[name].remove(value=value)
+        if released:
+            self.order_book_WIP -= 1
+            if self.sim.data.state_recorder is not None:
+                self.sim.data.state_recorder.update()
+        return
+
+    def get_order_book_contributions(self, order):
+        """
+        values an order contributes to the order book statistics. Time dependent priorities are stored without
+        their time component, as it shifts the priority of all orders uniformly
+        """
+        contributions = []
+        if self.sim.policy_panel.ssd_rule == 'SINGLE':
+            contributions.append(('pool', self.IPD_base(order=order, condition='pool')))
+        elif self.sim.policy_panel.ssd_rule == 'IPD':
+            contributions.append((('pool', order.next_work_centre), self.IPD_base(order=order, condition='pool')))
             if order.release:
-                wip += 1
-        return wip
+                contributions.append(('queue', self.IPD_base(order=order, condition='queue')))
+        if self.track_FOCUS:
+            for operation in order.routing_sequence:
+                contributions.append(('p_ij', order.process_time[operation]))
+            slack_base = order.due_date - order.remaining_process_time
+            contributions.append(('slack', slack_base))
+            contributions.append((('slack_opn', order.remaining_operations), slack_base))
+        return contributions
+
+    def get_order_book_statistic(self, name):
+        if name not in self.order_book_statistics:
+            self.order_book_statistics[name] = OrderBookStatistic()
+        return self.order_book_statistics[name]
+
+    def IPD_base(self, order, condition):
+        """
+        IPD priority without the time component, see IPD_time_sign
+        """
+        if condition == 'pool':
+            if self.sim.policy_panel.sequencing_rule == "FISFO":
+                return -order.arrival_time
+            elif self.sim.policy_panel.sequencing_rule == "EDD":
+                return order.due_date
+            elif self.sim.policy_panel.rationing_rule == "PRD":
+                return order.planned_release_time
+            else:
+                raise Exception('no valid pool sequencing rule selected for IPD')
+        elif condition == 'queue':
+            if self.sim.policy_panel.dispatching_rule == "FCFS":
+                return order.queue_entry_time[order.next_work_centre]
+            elif self.sim.policy_panel.dispatching_rule == "FISFO":
+                return -order.arrival_time
+            elif self.sim.policy_panel.dispatching_rule == "FI-SHOP-FO":
+                return -order.release_time
+            elif self.sim.policy_panel.dispatching_rule == "EDD":
+                return order.due_date
+            else:
+                raise Exception('no valid dispatching rule selected for IPD')
+        else:
+            raise Exception('no valid IPD procedure')
+
+    def IPD_time_sign(self, condition):
+        """
+        the IPD priority equals IPD_base + sign * t
+        """
+        if condition == 'pool' and self.sim.policy_panel.sequencing_rule == "FISFO":
+            return 1
+        elif condition == 'queue' and self.sim.policy_panel.dispatching_rule in ["FISFO", "FI-SHOP-FO"]:
+            return 1
+        elif condition == 'queue' and self.sim.policy_panel.dispatching_rule == "EDD":
+            return -1
+        return 0
+
+    def time_shift(self, value, sign):
+        if sign == 0:
+            return value
+        return value + sign * self.sim.env.now
+
+    def get_wip(self):
+        return self.order_book_WIP
 
     def __str__(self):
         return "DRACO"
+
+
+class OrderBookStatistic(object):
+    def __init__(self):
+        """
+        multiset of values with count, sum, minimum and maximum.
+        removal is lazy: removed values are dropped from the heaps once they reach the top
+        """
+        self.min_heap = []
+        self.max_heap = []
+        self.multiplicity = {}
+        self.count = 0
+        self.total = 0
+        return
+
+    def add(self, value):
+        heappush(self.min_heap, value)
+        heappush(self.max_heap, -value)
+        self.multiplicity[value] = self.multiplicity.get(value, 0) + 1
+        self.count += 1
+        self.total += value
+        return
+
+    def remove(self, value):
+        self.multiplicity[value] -= 1
+        if self.multiplicity[value] == 0:
+            del self.multiplicity[value]
+        self.count -= 1
+        self.total -= value
+        # rebuild the heaps if they mainly hold removed values
+        if len(self.min_heap) > 2 * self.count + 64:
+            self.min_heap = [value for value, n in self.multiplicity.items() for _ in range(n)]
+            self.max_heap = [-value for value in self.min_heap]
+            heapify(self.min_heap)
+            heapify(self.max_heap)
+        return
+
+    def min(self):
+        while self.min_heap[0] not in self.multiplicity:
+            heappop(self.min_heap)
+        return self.min_heap[0]
+
+    def max(self):
+        while -self.max_heap[0] not in self.multiplicity:
+            heappop(self.max_heap)
+        return -self.max_heap[0]
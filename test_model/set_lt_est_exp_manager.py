@@ -5,6 +5,7 @@ Version: 1.0.0
 """
 
 from set_lt_estimates import SimulationModel
+from set_lt_estimates_lindley import LindleyModel
 import time
 
 # track run time
@@ -14,10 +15,16 @@ start_time = time.time()
 lower_limit = 0
 upper_limit = 1#336
 
+# simulation engine, lindley computes immediate release FCFS flow shops with the Lindley recursion
+engine = 'simpy'  # 'lindley' #
+
 # activate the simulation (automatic model)
 for exp_number in range(lower_limit, upper_limit):
       # import simulation model and run simulation
-      simulation = SimulationModel(exp_number)
+      if engine == 'lindley':
+            simulation = LindleyModel(exp_number)
+      else:
+            simulation = SimulationModel(exp_number)
       simulation.sim_function()
 
 # provide essential experimental information
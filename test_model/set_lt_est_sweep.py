@@ -0,0 +1,91 @@
+"""
+Project: ProcessSim
+Made By: Arno Kasper
+Version: 1.0.0
+
+sweep over the (utilization, m_machines) grid of set_lt_est_exp_paramaters. The cells run in parallel on a process
+pool, each with the sequential stopping rule, and the runs of each completed cell are appended to a single table.
+The column converged is False for the cells that reached the maximum number of runs before the stopping rule was
+satisfied.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import os
+import time
+
+import set_lt_est_exp_paramaters as parameters
+
+
+def run_cell(exp_number, engine, stopping_rule, max_runs=None):
+    """
+    run a single cell of the grid, executed in a worker process
+    :param exp_number: experiment number
+    :param engine: simpy or lindley
+    :param stopping_rule: fixed or sequential
+    :param max_runs: maximum number of runs of the sequential stopping rule, None uses the control panel
+    :return: experiment database of the cell
+    """
+    from set_lt_estimates import stopping_rule_satisfied
+    if engine == 'lindley':
+        from set_lt_estimates_lindley import LindleyModel
+        simulation = LindleyModel(exp_number)
+    elif engine == 'simpy':
+        from set_lt_estimates import SimulationModel
+        simulation = SimulationModel(exp_number)
+    else:
+        raise Exception("no valid engine selected")
+    simulation.print_info = False
+    simulation.control_panel.print_final_info = False
+    simulation.control_panel.stopping_rule = stopping_rule
+    if max_runs is not None:
+        simulation.control_panel.max_runs = max_runs
+    simulation.sim_function(save_dataset=False)
+    database = simulation.data.experiment_database
+    database['converged'] = stopping_rule_satisfied(database=database, control_panel=simulation.control_panel)
+    return database
+
+
+def run_sweep(file, engine='lindley', stopping_rule='sequential', workers=None, max_runs=None):
+    """
+    run all cells of the grid and stream their runs to the file
+    :param file: csv file of the consolidated table, overwritten
+    :param max_runs: maximum number of runs of the sequential stopping rule, None uses the control panel
+    :param workers: number of worker processes, None uses all processors
+    :return: void
+    """
+    number_of_cells = len(parameters.get_interactions())
+    if os.path.exists(file):
+        os.remove(file)
+    header = True
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_cell, exp_number, engine, stopping_rule, max_runs): exp_number
+                   for exp_number in range(number_of_cells)}
+        for completed, future in enumerate(as_completed(futures), start=1):
+            database = future.result()
+            database.insert(0, 'exp_number', futures[future])
+            database.to_csv(file, mode='a', header=header, index=False)
+            header = False
+            print(f"cell {completed}/{number_of_cells}: utilization {database['aimed_utilization'].iloc[0]}, "
+                  f"m {database['machines_m'].iloc[0]}, {database.shape[0]} runs, "
+                  f"mean lead time {round(database['mean_lt'].mean(), 4)}")
+            if not database['converged'].iloc[0]:
+                print(f"\tWARNING: cell {futures[future]} did not converge within {database.shape[0]} runs")
+    return
+
+
+# activate the code
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--engine', default='lindley', choices=['lindley', 'simpy'])
+    parser.add_argument('--stopping-rule', default='sequential', choices=['sequential', 'fixed'])
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--max-runs', type=int, default=None,
+                        help='maximum number of runs of the sequential stopping rule')
+    parser.add_argument('--output', default='lt_est_sweep.csv', help='csv file of the consolidated table')
+    arguments = parser.parse_args()
+
+    # track run time
+    start_time = time.time()
+    run_sweep(file=arguments.output, engine=arguments.engine, stopping_rule=arguments.stopping_rule,
+              workers=arguments.workers, max_runs=arguments.max_runs)
+    print(f"\n\nSweep finished in {round(time.time() - start_time, 2)} seconds, results saved in {arguments.output}")
@@ -17,6 +17,7 @@ import warnings
 import os
 import time
 import math
+from scipy import stats
 import set_lt_est_exp_paramaters as parameters
 
 
@@ -47,6 +48,15 @@ class ControlPanel(object):
         self.run_time = 10000
         self.number_of_runs = 100
 
+        # stopping rule (fixed runs all replications, sequential stops once the relative half-width of the 95%
+        # confidence interval of all stopping criteria is below the precision, with at least min_runs and at most
+        # max_runs replications)
+        self.stopping_rule = 'fixed'  # 'sequential' #
+        self.stopping_criteria = ['mean_lt', 'std_lt']
+        self.stopping_precision = 0.02
+        self.min_runs = 10
+        self.max_runs = 100
+
         # shop layout
         self.order_pool = simpy.FilterStore(self.sim.env)
         self.manufacturing_process_layout = []
@@ -98,6 +108,14 @@ class ControlPanel(object):
         """
         self.dispatching_rule = "FCFS"
 
+    def simulated_runs(self):
+        """
+        :return: number of runs to simulate, at most max_runs with the sequential stopping rule
+        """
+        if self.stopping_rule == 'sequential':
+            return self.max_runs
+        return self.number_of_runs
+
 
 class DataControl(object):
     def __init__(self, simulation):
@@ -429,7 +447,7 @@ class Process(object):
             yield self.sim.env.timeout(t)
             i += 1
             # break statement to stop simulation
-            if self.sim.env.now >= (self.warmup_period + self.run_time) * self.number_of_runs:
+            if self.sim.env.now >= (self.warmup_period + self.run_time) * self.sim.control_panel.simulated_runs():
                 break
 
     def manufacturing_process(self, order):
@@ -569,9 +587,10 @@ class SimulationModel(object):
         self.run_manager = None
 
     # the actual simulation function with all required SimPy settings---------------------------------------------------
-    def sim_function(self):
+    def sim_function(self, save_dataset=True):
         """
         initialling and timing of the generator functions
+        :param save_dataset: save the database of the experiment
         :return: void
         """
 
@@ -583,11 +602,16 @@ class SimulationModel(object):
 
         # start simulation
         sim_time = (self.control_panel.warmup_period + self.control_panel.run_time) * \
-                   self.control_panel.number_of_runs + 0.001
-        self.env.run(until=sim_time)
+                   self.control_panel.simulated_runs() + 0.001
+        if self.control_panel.stopping_rule == 'sequential':
+            # the run manager ends the simulation once the stopping rule is satisfied
+            self.env.run(until=self.run_manager)
+        else:
+            self.env.run(until=sim_time)
 
         # simulation finished: save database and print final info
-        self.data.save_dataset()
+        if save_dataset:
+            self.data.save_dataset()
 
         if self.control_panel.print_final_info:
             #print(f"\nMean results of experiment:")
@@ -601,7 +625,7 @@ class SimulationModel(object):
         :return: void
         """
         while self.env.now < (
-                self.control_panel.warmup_period + self.control_panel.run_time) * self.control_panel.number_of_runs:
+                self.control_panel.warmup_period + self.control_panel.run_time) * self.control_panel.simulated_runs():
             yield self.env.timeout(self.control_panel.warmup_period)
             # chance the warm_up status
             self.warm_up = True
@@ -620,6 +644,11 @@ class SimulationModel(object):
             if self.print_info:
                 self._print_run_info()
 
+            # stop the replications if the confidence intervals are tight enough
+            if self.control_panel.stopping_rule == 'sequential' and \
+                    stopping_rule_satisfied(database=self.data.experiment_database, control_panel=self.control_panel):
+                return
+
     def _print_run_info(self):
         # vital simulation results are given
         run_number = int(self.env.now / (self.control_panel.warmup_period + self.control_panel.run_time))
@@ -635,6 +664,26 @@ class SimulationModel(object):
         return
 
 
+def stopping_rule_satisfied(database, control_panel):
+    """
+    sequential stopping rule on the runs of the database
+    :param database: experiment database
+    :param control_panel: control panel with the stopping rule settings
+    :return: True if the relative half-width of the confidence interval of all criteria is below the precision
+    """
+    n = database.shape[0]
+    if n < max(control_panel.min_runs, 2):
+        return False
+    t_value = stats.t.ppf(1 - 0.025, df=n - 1)
+    for criteria in control_panel.stopping_criteria:
+        mean = database.loc[:, criteria].mean()
+        half_width = t_value * database.loc[:, criteria].std() / math.sqrt(n)
+        # an undefined half-width (nan) does not satisfy the stopping rule
+        if not half_width <= control_panel.stopping_precision * abs(mean):
+            return False
+    return True
+
+
 # activate the code
 if __name__ == '__main__':
     # track run time
@@ -0,0 +1,275 @@
+"""
+Lindley recursion engine of the lead time estimation model
+
+with immediate release and FCFS dispatching, the shop of set_lt_estimates.py is a general flow shop of single FCFS
+servers. The departure of each order at a work centre follows the Lindley recursion in the order of arrival at that
+work centre, d_k = max(a_k, d_k-1) + p_k. As all routings follow the same work centre sequence, the work centres are
+computed one after the other, each in array operations:
+    d_k = C_k + max_{i <= k}(a_i - C_i-1), with C_k the cumulative process time at the work centre
+The results are stored in the same database as the SimPy model, without simulating the events.
+"""
+import random
+import time
+
+import numpy as np
+import pandas as pd
+import simpy
+
+from set_lt_estimates import ControlPanel, DataControl, GeneralFunctions, stopping_rule_satisfied
+
+
+class LindleyModel(object):
+    def __init__(self, exp_number=1, random_numbers='numpy', seed=999999):
+        """
+        :param exp_number: experiment number of set_lt_est_exp_paramaters
+        :param random_numbers: source of the random numbers
+            - numpy: vectorized numpy generator
+            - python: the random streams of the SimPy model, drawn in the same order. The routings are drawn from the
+            global random module, as in the SimPy model
+        :param seed: seed of the numpy generator
+        """
+        self.exp_number = exp_number
+        self.random_numbers = random_numbers
+        self.seed = seed
+        # the control panel creates the SimPy resources, the environment is not simulated
+        self.env = simpy.Environment()
+        self.general_functions = GeneralFunctions(simulation=self)
+        self.control_panel = ControlPanel(simulation=self, exp_number=exp_number)
+        self.print_info = self.control_panel.print_info
+        self.data = DataControl(simulation=self)
+
+        # the recursion only holds for immediate release of FCFS flow shops
+        if self.control_panel.LUMS_COR:
+            raise Exception("the Lindley engine requires immediate release")
+        if self.control_panel.dispatching_rule != "FCFS":
+            raise Exception("the Lindley engine requires FCFS dispatching")
+        if not self.control_panel.general_flow_shop:
+            raise Exception("the Lindley engine requires a general flow shop")
+
+        # the routings of the SimPy model are sorted by work centre name
+        self.work_centres = sorted(self.control_panel.manufacturing_process_layout)
+        self.end_time = None
+
+    def generate_orders(self):
+        """
+        :return: arrival times, routings (orders x work centres, True if visited) and process times of all orders
+        """
+        # the stopping rule may change after the model is created
+        self.end_time = (self.control_panel.warmup_period + self.control_panel.run_time) * \
+            self.control_panel.simulated_runs()
+        if self.random_numbers == 'numpy':
+            return self.generate_orders_numpy()
+        elif self.random_numbers == 'python':
+            return self.generate_orders_python()
+        raise Exception("no valid source of random numbers selected")
+
+    def generate_orders_numpy(self):
+        generator = np.random.default_rng(self.seed)
+        m = len(self.work_centres)
+        # arrivals until the end of the simulation, the first order arrives at time zero
+        mean_time_between_arrival = self.control_panel.mean_time_between_arrival
+        expected_orders = int(self.end_time / mean_time_between_arrival)
+        arrival = np.zeros(1)
+        while arrival[-1] < self.end_time:
+            inter_arrival_times = generator.exponential(mean_time_between_arrival,
+                                                        expected_orders // 10 + 10 * int(np.sqrt(expected_orders)) + 10)
+            arrival = np.concatenate((arrival, arrival[-1] + np.cumsum(inter_arrival_times)))
+        arrival = arrival[arrival < self.end_time]
+        n = arrival.shape[0]
+
+        # routing length uniform between 1 and m, a random subset of the work centres
+        routing_length = generator.integers(1, m + 1, n)
+        keys = generator.random((n, m))
+        routing = keys <= np.sort(keys, axis=1)[np.arange(n), routing_length - 1][:, None]
+
+        # process times
+        if self.control_panel.process_time_distribution == '2_erlang':
+            process_time = generator.standard_gamma(2, (n, m)) * self.control_panel.mean_process_time / 2
+        elif self.control_panel.process_time_distribution == 'exponential':
+            process_time = generator.standard_exponential((n, m)) * self.control_panel.mean_process_time
+        else:
+            raise Exception("no valid process time distribution selected")
+        process_time[~routing] = 0
+        return arrival, routing, process_time
+
+    def generate_orders_python(self):
+        """
+        the random numbers of the SimPy model: the due date and process times from the general functions, the routing
+        from the global random module and the inter arrival times from the stream of the process
+        """
+        arrival_generator = random.Random()
+        arrival_generator.seed(999999)
+        generator = self.general_functions.random_generator
+        layout = self.control_panel.manufacturing_process_layout
+        m = self.control_panel.m
+        position = {work_centre: j for j, work_centre in enumerate(self.work_centres)}
+        min_dd, max_dd = self.control_panel.min_max_random_dd
+        mean = self.control_panel.mean_process_time
+        two_erlang = self.control_panel.process_time_distribution == '2_erlang'
+        if self.control_panel.process_time_distribution not in ['2_erlang', 'exponential']:
+            raise Exception("no valid process time distribution selected")
+
+        arrival = []
+        routing_rows = []
+        process_time_rows = []
+        now = 0.0
+        while True:
+            arrival.append(now)
+            # the due date is drawn to keep the stream aligned with the SimPy model
+            generator.uniform(min_dd, max_dd)
+            routing_sequence = random.sample(layout, random.randint(1, m))
+            routing_sequence.sort()
+            row = [0.0] * m
+            for work_centre in routing_sequence:
+                if two_erlang:
+                    row[position[work_centre]] = generator.expovariate(mean * 2) + generator.expovariate(mean * 2)
+                else:
+                    row[position[work_centre]] = generator.expovariate(mean)
+            routing_rows.append([position[work_centre] for work_centre in routing_sequence])
+            process_time_rows.append(row)
+            now += arrival_generator.expovariate(1 / self.control_panel.mean_time_between_arrival)
+            if now >= self.end_time:
+                break
+
+        process_time = np.array(process_time_rows)
+        routing = np.zeros(process_time.shape, dtype=bool)
+        for i, row in enumerate(routing_rows):
+            routing[i, row] = True
+        return np.array(arrival), routing, process_time
+
+    def flow_shop(self, arrival, routing, process_time):
+        """
+        departure times of all orders at all work centres, computed work centre by work centre
+        :return: completion time of each order, finishing times and process times of all operations
+        """
+        ready = arrival.copy()
+        finish_times = []
+        operation_times = []
+        for j in range(routing.shape[1]):
+            orders = np.flatnonzero(routing[:, j])
+            # FCFS: the order of arrival at the work centre, ties in order of creation
+            orders = orders[np.argsort(ready[orders], kind='stable')]
+            a = ready[orders]
+            p = process_time[orders, j]
+            cumulative = np.cumsum(p)
+            departure = cumulative + np.maximum.accumulate(a - (cumulative - p))
+            ready[orders] = departure
+            finish_times.append(departure)
+            operation_times.append(p)
+        return ready, np.concatenate(finish_times), np.concatenate(operation_times)
+
+    def run_index(self, t):
+        """
+        :param t: array of times
+        :return: run of each time (starting at 0), -1 in the warm-up periods or after the simulation
+        """
+        warmup_period = self.control_panel.warmup_period
+        period_length = warmup_period + self.control_panel.run_time
+        period = np.floor(t / period_length).astype(np.int64)
+        in_run = (t - period * period_length >= warmup_period) & (period < self.control_panel.simulated_runs())
+        return np.where(in_run, period, -1)
+
+    def completed_orders(self):
+        """
+        :return: throughput time and routing length of the orders completed in the runs
+        """
+        arrival, routing, process_time = self.generate_orders()
+        completion, _, _ = self.flow_shop(arrival=arrival, routing=routing, process_time=process_time)
+        in_run = self.run_index(completion) >= 0
+        return (completion - arrival)[in_run], routing.sum(axis=1)[in_run]
+
+    def run_results(self, arrival, routing, completion, finish_times, operation_times):
+        """
+        the database of the SimPy model, one row per run with the orders completed in the run
+        """
+        run_time = self.control_panel.run_time
+        number_of_runs = self.control_panel.simulated_runs()
+        m = len(self.work_centres)
+        run_index = self.run_index
+
+        orders_run = run_index(completion)
+        in_run = orders_run >= 0
+        orders_run = orders_run[in_run]
+        throughput_time = (completion - arrival)[in_run]
+        operation_ttt = throughput_time / routing.sum(axis=1)[in_run]
+        operations_run = run_index(finish_times)
+        accumulated_process_time = np.bincount(operations_run[operations_run >= 0],
+                                               weights=operation_times[operations_run >= 0],
+                                               minlength=number_of_runs)
+
+        def mean_std(values):
+            count = np.bincount(orders_run, minlength=number_of_runs)
+            mean = np.bincount(orders_run, weights=values, minlength=number_of_runs) / count
+            squares = np.bincount(orders_run, weights=(values - mean[orders_run]) ** 2, minlength=number_of_runs)
+            return count, mean, np.sqrt(squares / (count - 1))
+
+        nr_flow_items, mean_lt, std_lt = mean_std(throughput_time)
+        _, mean_operation_ttt, std_operation_ttt = mean_std(operation_ttt)
+        est_mean = self.general_functions.get_mean_manufacturing_lead_time()
+        est_stddev_mm1 = self.general_functions.get_std_dev_manufacturing_lead_time_mm1()
+        est_stddev_mg1 = self.general_functions.get_std_dev_manufacturing_lead_time_mg1()
+
+        database = {"run": np.arange(1, number_of_runs + 1),
+                    "nr_flow_items": nr_flow_items,
+                    "utilization": accumulated_process_time * 100 / m / run_time,
+                    "mean_lt": mean_lt,
+                    "std_lt": std_lt,
+                    "est_mean_lt": est_mean,
+                    "est_std_lt_mm1": est_stddev_mm1,
+                    "est_std_lt_mg1": est_stddev_mg1,
+                    "gap_mean_lt": (mean_lt - est_mean) / mean_lt,
+                    "gap_std_lt_mm1": (std_lt - est_stddev_mm1) / std_lt,
+                    "gap_std_lt_mg1": (std_lt - est_stddev_mg1) / std_lt,
+                    "mean_operation_ttt": mean_operation_ttt,
+                    "std_operation_ttt": std_operation_ttt,
+                    "aimed_utilization": self.control_panel.aimed_utilization,
+                    "machines_m": self.control_panel.m}
+        return database
+
+    def compute(self):
+        """
+        compute the experiment database
+        :return: void
+        """
+        arrival, routing, process_time = self.generate_orders()
+        completion, finish_times, operation_times = self.flow_shop(arrival=arrival,
+                                                                   routing=routing,
+                                                                   process_time=process_time)
+        database = pd.DataFrame(self.run_results(arrival=arrival,
+                                                 routing=routing,
+                                                 completion=completion,
+                                                 finish_times=finish_times,
+                                                 operation_times=operation_times))
+        if self.control_panel.stopping_rule == 'sequential':
+            # the runs follow each other, the runs up to the stopping run equal a simulation stopped at that run
+            for run_number in range(1, database.shape[0] + 1):
+                if stopping_rule_satisfied(database=database.iloc[:run_number], control_panel=self.control_panel):
+                    database = database.iloc[:run_number]
+                    break
+        self.data.experiment_database = database
+        return
+
+    def sim_function(self, save_dataset=True):
+        """
+        compute and save the experiment, as the SimPy model
+        :param save_dataset: save the database of the experiment
+        :return: void
+        """
+        self.compute()
+        if save_dataset:
+            self.data.save_dataset()
+        if self.control_panel.print_final_info:
+            print(self.data.experiment_database.describe().loc[['mean']].to_string(index=False))
+        return
+
+
+# activate the code
+if __name__ == '__main__':
+    # track run time
+    start_time = time.time()
+
+    # compute the experiment
+    model = LindleyModel()
+    model.sim_function()
+
+    print(f"\n\nExperiment finished in {round(time.time() - start_time, 2)} seconds")
@@ -0,0 +1,80 @@
+"""
+Project: ProcessSim
+Made By: Arno Kasper
+Version: 1.0.0
+
+build the cache of simulated manufacturing lead time quantiles used by the planned lead times of the full model
+(PLANNED_LEAD_TIME = 'simulated'). The lead times of the general flow shop are computed with the Lindley engine for each
+number of stations, process time distribution and utilization level. The quantiles of each routing length are stored
+for the probabilities of the cost ratios, c_t / (c_t + c_e), and a grid of other probabilities.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import set_lt_est_exp_paramaters as parameters
+from set_lt_estimates_lindley import LindleyModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'full_model'))
+from leadtimequantiles import CACHE_FILE, save_cache, table_key
+
+# grid of the cache
+utilization_levels = [x / 100 for x in range(50, 98)]
+station_levels = [6]
+process_time_distributions = ['2_erlang', 'exponential']
+# the Lindley engine simulates a general flow shop, the routing configuration GFS of the full model
+ROUTING_CONFIGURATION = 'GFS'
+# probabilities of the cost ratios of exp_paramaters (tardiness cost 1.5, 3, 5, 9 and earliness cost 0.5)
+probability_levels = sorted({0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99, 1.5 / 2, 3 / 3.5, 5 / 5.5, 9 / 9.5})
+
+
+def build_table(stations, process_time_distribution):
+    """
+    :return: table with the quantiles [utilization][routing length][probability]
+    """
+    parameters.m_levels = [stations]
+    parameters.utilization_levels = utilization_levels
+    quantiles = []
+    settings = None
+    for exp_number, utilization in enumerate(utilization_levels):
+        model = LindleyModel(exp_number)
+        model.control_panel.process_time_distribution = process_time_distribution
+        throughput_time, routing_length = model.completed_orders()
+        quantiles.append([np.quantile(throughput_time[routing_length == r], probability_levels).tolist()
+                          for r in range(1, stations + 1)])
+        settings = {'engine': 'lindley',
+                    'warmup_period': model.control_panel.warmup_period,
+                    'run_time': model.control_panel.run_time,
+                    'number_of_runs': model.control_panel.number_of_runs,
+                    'mean_process_time': model.control_panel.mean_process_time,
+                    'seed': model.seed}
+        print(f"{process_time_distribution}, {stations} stations, utilization {utilization}: "
+              f"{throughput_time.shape[0]} orders")
+    table = {'utilization': utilization_levels,
+             'routing_length': list(range(1, stations + 1)),
+             'probability': probability_levels,
+             'quantiles': quantiles}
+    return table, settings
+
+
+# activate the code
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default=CACHE_FILE, help='json file of the cache')
+    arguments = parser.parse_args()
+
+    start_time = time.time()
+    tables = {}
+    settings = None
+    for m in station_levels:
+        for distribution in process_time_distributions:
+            table, settings = build_table(stations=m, process_time_distribution=distribution)
+            tables[table_key(stations=m,
+                             process_time_distribution=distribution,
+                             routing_configuration=ROUTING_CONFIGURATION,
+                             mean_process_time=settings['mean_process_time'])] = table
+    save_cache(file=arguments.output, tables=tables, settings=settings)
+    print(f"\n\nCache saved in {arguments.output} after {round(time.time() - start_time, 2)} seconds")
@@ -0,0 +1,70 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+
+import pytest
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPOSITORY, 'benchmarks'))
+from golden_output import MODEL_SETTINGS  # noqa: E402
+
+EXPERIMENTS = [0, 1, 2, 3]
+
+# runs the experiments with the model of a tree. The original model panel has no model settings, there the settings
+# are set after the model panel
+RUNNER = """
+import contextlib, inspect, io, json, sys
+sys.path.insert(0, sys.argv[1])
+import controlpanel
+settings = json.loads(sys.argv[2])
+model_settings = {'model_settings': settings}
+if 'model_settings' not in inspect.signature(controlpanel.ModelPanel.__init__).parameters:
+    model_settings = {}
+    init = controlpanel.ModelPanel.__init__
+    def patched(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        for name, value in settings.items():
+            setattr(self, name, value)
+    controlpanel.ModelPanel.__init__ = patched
+import simulationmodel
+output = {}
+for exp_number in json.loads(sys.argv[3]):
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = simulationmodel.SimulationModel(exp_number=exp_number, **model_settings)
+        sim.sim_function()
+    output[exp_number] = sim.data.experiment_database.to_csv(index=False)
+print(json.dumps(output))
+"""
+
+
+def git(*arguments):
+    return subprocess.run(['git', *arguments], cwd=REPOSITORY, capture_output=True, check=True).stdout
+
+
+def run_tree(model_directory, model_settings):
+    result = subprocess.run([sys.executable, '-c', RUNNER, model_directory, json.dumps(model_settings),
+                             json.dumps(EXPERIMENTS)], cwd=model_directory, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_golden_settings_reproduce_the_baseline(tmp_path):
+    """
+    the golden output follows the baseline model: with the pinned settings, the first commit and the current tree give
+    the same experiment databases
+    """
+    try:
+        baseline = git('rev-list', '--max-parents=0', 'HEAD').decode().split()[0]
+        archive = git('archive', '--format=tar', baseline, 'full_model')
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip("the baseline commit is not available")
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(tmp_path)
+
+    baseline_output = run_tree(str(tmp_path / 'full_model'), MODEL_SETTINGS)
+    current_output = run_tree(os.path.join(REPOSITORY, 'full_model'), MODEL_SETTINGS)
+    for exp_number in EXPERIMENTS:
+        assert current_output[str(exp_number)] == baseline_output[str(exp_number)], f"experiment {exp_number}"
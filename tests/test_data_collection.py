@@ -0,0 +1,18 @@
+import pandas as pd
+
+from simulationmodel import SimulationModel
+
+
+def test_experiment_database_is_cached_until_a_chunk_is_stored():
+    sim = SimulationModel(exp_number=0, print_info=False, model_settings={'data_collection': 'order'})
+    data = sim.data
+    assert data.experiment_database is None
+    data.store_chunk(database=pd.DataFrame({'run': [1, 1], 'throughput_time': [2.0, 3.0]}))
+    data.store_chunk(database=pd.DataFrame({'run': [2], 'throughput_time': [4.0]}))
+    database = data.experiment_database
+    assert list(database['throughput_time']) == [2.0, 3.0, 4.0]
+    assert data.experiment_database is database
+
+    data.store_chunk(database=pd.DataFrame({'run': [3], 'throughput_time': [5.0]}))
+    assert list(data.experiment_database['run']) == [1, 1, 2, 3]
+    assert list(data.experiment_database.index) == [0, 1, 2, 3]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from capacity_sources import HeapQueue, Queue
+from simulationmodel import SimulationModel, run_replication_block
+
+
+def test_queue_mode_is_applied_before_the_queues_are_built():
+    sim = SimulationModel(exp_number=0, print_info=False, model_settings={'QUEUE_MODE': 'filter_store'})
+    queues = sim.model_panel.QUEUES
+    assert all(type(queue) is Queue for queue in queues)
+    sim = SimulationModel(exp_number=0, print_info=False, model_settings={'QUEUE_MODE': 'heap'})
+    assert all(type(queue) is HeapQueue for queue in sim.model_panel.QUEUES)
+
+
+def test_data_collection_is_applied_before_the_experiment_name():
+    sim = SimulationModel(exp_number=0, print_info=False, model_settings={'data_collection': 'main'})
+    assert not sim.model_panel.experiment_name.startswith('df_')
+    sim = SimulationModel(exp_number=0, print_info=False, model_settings={'data_collection': 'order'})
+    assert sim.model_panel.experiment_name.startswith('df_order_')
+
+
+def test_model_settings_are_validated():
+    with pytest.raises(Exception, match="main data collection"):
+        SimulationModel(exp_number=0, print_info=False,
+                        model_settings={'STOPPING_RULE': 'sequential', 'data_collection': 'periodic'})
+    with pytest.raises(Exception, match="not a setting of the model panel"):
+        SimulationModel(exp_number=0, print_info=False, model_settings={'UNKNOWN_SETTING': 1})
+
+
+def test_model_settings_reach_the_independent_replication_blocks():
+    settings = {'WARM_UP_PERIOD': 50, 'RUN_TIME': 100, 'data_collection': 'main', 'print_results': False}
+    database, order_input_counter, _ = run_replication_block(exp_number=0, first_run=1, number_of_runs=2,
+                                                             seed_sequence=np.random.SeedSequence(1),
+                                                             model_settings=settings)
+    assert list(database['run']) == [1, 2]
+    assert 'mean_ttt' in database.columns
+    # two runs of 150 time units, not the default run length
+    assert order_input_counter < 1000
+
+
+def test_warm_start_does_not_support_the_sequential_stopping_rule():
+    with pytest.raises(Exception, match="warm-started replications"):
+        SimulationModel(exp_number=0, print_info=False,
+                        model_settings={'REPLICATION_MODE': 'independent', 'WARM_START': True,
+                                        'STOPPING_RULE': 'sequential', 'data_collection': 'main'})
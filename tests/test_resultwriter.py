@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from resultwriter import ParquetResultWriter, load_experiment, result_file  # noqa: E402
+
+
+def test_parquet_round_trip(tmp_path):
+    file = result_file(path=str(tmp_path), experiment_name='experiment')
+    runs = [pd.DataFrame({'run': np.full(3, run), 'identifier': np.arange(3) + 3 * run,
+                          'throughput_time': np.random.default_rng(run).random(3), 'material': ['A', 'B', 'C']})
+            for run in range(1, 4)]
+    writer = ParquetResultWriter(file=file)
+    for database in runs:
+        writer.write(database=database)
+    writer.close()
+    assert writer.rows == 9
+
+    loaded = list(load_experiment(file=file))
+    assert len(loaded) == len(runs)
+    for database, loaded_database in zip(runs, loaded):
+        pd.testing.assert_frame_equal(loaded_database, database)
+    columns = next(load_experiment(file=file, columns=['run', 'throughput_time']))
+    assert list(columns.columns) == ['run', 'throughput_time']